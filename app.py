@@ -1,15 +1,18 @@
 from __future__ import annotations
 
-import tkinter as tk
+from typing import Callable
 import os
-import tempfile
+import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, colorchooser
 
 import config
 from canvas_view import CanvasView
-from exporter import HudExporter
-from model import InputDef, Project, Shape
-from storage import load_project, save_project
+from cost_model import estimate_cost, format_report
+from export_passes import eliminate_dead
+from exporter import ExportOptions, HudExporter, SnippetCache
+from model import InputDef, PrecisionPolicy, Project, Shape
+from storage import id_map_path, load_manifest, load_project, manifest_path, save_id_map, save_manifest, save_project
+from targets import export_targets, load_targets
 
 
 class EgpApp:
@@ -35,6 +38,23 @@ class EgpApp:
         self._bounds_h_var = tk.StringVar()
         self._history: list[dict] = []
         self._restoring = False
+        self._snippet_cache = SnippetCache()
+        self._optimize_vectors_var = tk.BooleanVar(value=False)
+        self._fuse_calls_var = tk.BooleanVar(value=True)
+        self._changed_updates_var = tk.BooleanVar(value=False)
+        self._pack_objects_var = tk.BooleanVar(value=False)
+        self._cull_occluded_var = tk.BooleanVar(value=False)
+        self._drop_dead_var = tk.BooleanVar(value=False)
+        self._parent_layers_var = tk.BooleanVar(value=False)
+        self._watch_resolution_var = tk.BooleanVar(value=False)
+        self._table_emission_var = tk.BooleanVar(value=False)
+        self._minify_var = tk.BooleanVar(value=False)
+        self._stable_ids_var = tk.BooleanVar(value=False)
+        self._write_id_map_var = tk.BooleanVar(value=False)
+        self._init_objects_per_tick = 0
+        self._simplify_tolerance = 0.0
+        self._max_poly_vertices = 0
+        self._init_ops_per_tick = 0
 
         self._build_menu()
         self._build_layout()
@@ -67,11 +87,35 @@ class EgpApp:
         file_menu.add_command(label="Save As...", command=self.save_project_as)
         file_menu.add_separator()
         file_menu.add_command(label="Export HUD...", command=self.export_hud)
+        file_menu.add_command(label="Export Patch...", command=self.export_patch)
+        file_menu.add_command(label="Export for Targets...", command=self.export_for_targets)
         file_menu.add_command(label="Copy HUD to Clipboard", command=self.copy_hud_to_clipboard)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         menu.add_cascade(label="File", menu=file_menu)
 
+        export_menu = tk.Menu(menu, tearoff=0)
+        export_menu.add_checkbutton(label="Optimize Vector Math", variable=self._optimize_vectors_var)
+        export_menu.add_checkbutton(label="Fuse Colour/Alpha Calls", variable=self._fuse_calls_var)
+        export_menu.add_checkbutton(label="Change-Driven Text Updates", variable=self._changed_updates_var)
+        export_menu.add_checkbutton(label="Pack Objects (Merge Boxes/Lines)", variable=self._pack_objects_var)
+        export_menu.add_checkbutton(label="Cull Hidden Shapes", variable=self._cull_occluded_var)
+        export_menu.add_checkbutton(label="Drop Dead Shapes", variable=self._drop_dead_var)
+        export_menu.add_command(label="Lint Dead Shapes...", command=self.show_dead_shape_lint)
+        export_menu.add_checkbutton(label="Parent Shapes to Layer Anchors", variable=self._parent_layers_var)
+        export_menu.add_checkbutton(label="Re-layout on Screen Resize", variable=self._watch_resolution_var)
+        export_menu.add_checkbutton(label="Table-Driven Emission", variable=self._table_emission_var)
+        export_menu.add_checkbutton(label="Minify Output", variable=self._minify_var)
+        export_menu.add_checkbutton(label="Stable EGP Ids", variable=self._stable_ids_var)
+        export_menu.add_checkbutton(label="Write Id Map", variable=self._write_id_map_var)
+        export_menu.add_command(label="Compact EGP Ids", command=self.compact_egp_ids)
+        export_menu.add_separator()
+        export_menu.add_command(label="Staged Initialization...", command=self.configure_staged_init)
+        export_menu.add_command(label="Poly Simplification...", command=self.configure_simplify_tolerance)
+        export_menu.add_command(label="Poly Vertex Limit...", command=self.configure_poly_vertex_limit)
+        export_menu.add_command(label="Precision...", command=self.configure_precision)
+        menu.add_cascade(label="Export", menu=export_menu)
+
         view_menu = tk.Menu(menu, tearoff=0)
         view_menu.add_command(label="Zoom In", command=self.zoom_in)
         view_menu.add_command(label="Zoom Out", command=self.zoom_out)
@@ -212,7 +256,18 @@ class EgpApp:
         )
         mirror_y.pack(fill=tk.X, pady=4)
 
-        self._selection_only_buttons = [delete_btn, mirror_x, mirror_y]
+        simplify_btn = tk.Button(
+            self.toolbar_frame,
+            text="Simplify Poly",
+            command=self.simplify_selected_polys,
+            bg=config.THEME["panel_alt"],
+            fg=config.THEME["text"],
+            relief=tk.FLAT,
+            pady=4,
+        )
+        simplify_btn.pack(fill=tk.X, pady=4)
+
+        self._selection_only_buttons = [delete_btn, mirror_x, mirror_y, simplify_btn]
 
         zoom_in = tk.Button(
             self.toolbar_frame,
@@ -285,6 +340,7 @@ class EgpApp:
         self.font_var = tk.StringVar(value=config.DEFAULT_FONT)
         self.font_size_var = tk.IntVar(value=config.DEFAULT_FONT_SIZE)
         self.align_var = tk.StringVar(value="left")
+        self.update_rate_var = tk.IntVar(value=0)
 
         self.stroke_label, self.stroke_entry = self._create_labeled_entry("Stroke", self.stroke_var)
         self.fill_label, self.fill_entry = self._create_labeled_entry("Fill", self.fill_var)
@@ -294,6 +350,7 @@ class EgpApp:
         self.font_label, self.font_menu = self._create_labeled_option("Font", self.font_var, config.FONTS)
         self.font_size_label, self.font_size_spin = self._create_labeled_spin("Font Size", self.font_size_var, 6, 128)
         self.align_label, self.align_menu = self._create_labeled_option("Align", self.align_var, ["left", "center", "right"])
+        self.update_rate_label, self.update_rate_spin = self._create_labeled_spin("Update ms (0=input)", self.update_rate_var, 0, 60000)
 
         self.coord_label = tk.Label(self.properties_frame, text="Selection Center (X,Y)", bg=config.THEME["panel"], fg=config.THEME["muted"], font=("Segoe UI", 10))
         self.center_x_entry = tk.Entry(self.properties_frame, textvariable=self._center_x_var, bg=config.THEME["panel_alt"], fg=config.THEME["text"], insertbackground=config.THEME["text"], relief=tk.FLAT)
@@ -358,6 +415,7 @@ class EgpApp:
             ("font", self._grid_font_row),
             ("font_size", self._grid_font_size_row),
             ("align", self._grid_align_row),
+            ("update_rate", self._grid_update_rate_row),
             ("selection_center", self._grid_selection_center_row),
             ("selection_bounds", self._grid_selection_bounds_row),
             ("palette", self._grid_palette_row),
@@ -372,6 +430,7 @@ class EgpApp:
         self.font_var.trace_add("write", lambda *_: self._sync_tool_settings("font"))
         self.font_size_var.trace_add("write", lambda *_: self._sync_tool_settings("font_size"))
         self.align_var.trace_add("write", lambda *_: self._sync_tool_settings("align"))
+        self.update_rate_var.trace_add("write", lambda *_: self._sync_tool_settings("update_rate"))
 
         self._apply_property_layout(self._property_visibility([]))
 
@@ -492,6 +551,14 @@ class EgpApp:
         self.align_menu.grid(row=row, column=1, sticky="ew", pady=2)
         return row + 1
 
+    def _grid_update_rate_row(self, row: int) -> int:
+        """Description: Grid update rate row
+        Inputs: row: int
+        """
+        self.update_rate_label.grid(row=row, column=0, sticky="w")
+        self.update_rate_spin.grid(row=row, column=1, sticky="ew", pady=2)
+        return row + 1
+
     def _grid_selection_center_row(self, row: int) -> int:
         """Description: Grid selection center row
         Inputs: row: int
@@ -556,7 +623,7 @@ class EgpApp:
         if show_alpha:
             visible.add("alpha")
         if any_text:
-            visible.update({"text", "font", "font_size", "align"})
+            visible.update({"text", "font", "font_size", "align", "update_rate"})
         if has_selection:
             visible.update({"selection_center", "selection_bounds", "apply"})
         return visible
@@ -741,20 +808,6 @@ class EgpApp:
         """
         return f"{resolution[0]}x{resolution[1]}"
 
-    def _scale_project(self, old_res: tuple[int, int], new_res: tuple[int, int]) -> None:
-        """Description: Scale project
-        Inputs: old_res: tuple[int, int], new_res: tuple[int, int]
-        """
-        if old_res == new_res:
-            return
-        scale_x = new_res[0] / old_res[0]
-        scale_y = new_res[1] / old_res[1]
-        scale_avg = (scale_x + scale_y) / 2
-        for layer in self.project.layers:
-            for shape in layer.shapes:
-                shape.points = [(p[0] * scale_x, p[1] * scale_y) for p in shape.points]
-                shape.stroke_width = max(1, int(shape.stroke_width * scale_avg))
-
     def _on_resolution_change(self, label: str) -> None:
         """Description: On resolution change
         Inputs: label: str
@@ -762,10 +815,7 @@ class EgpApp:
         parts = label.split("x")
         if len(parts) != 2:
             return
-        old_res = self.project.resolution
-        new_res = (int(parts[0]), int(parts[1]))
-        self._scale_project(old_res, new_res)
-        self.project.resolution = new_res
+        self.project.rescale((int(parts[0]), int(parts[1])))
         self.canvas_view.auto_fit = True
         self.canvas_view.fit_to_view()
         self.canvas_view.draw()
@@ -849,6 +899,7 @@ class EgpApp:
             "font": self.font_var.get(),
             "font_size": self.font_size_var.get(),
             "align": self.align_var.get(),
+            "update_rate": self.update_rate_var.get(),
         }
         if changed_key:
             self.canvas_view.update_settings({changed_key: updates[changed_key]})
@@ -865,7 +916,7 @@ class EgpApp:
         """
         # Safety: bulk apply should NOT overwrite text content.
         # Text can still be edited explicitly on selected text objects via the text field.
-        bulk_keys = ["stroke", "stroke_width", "alpha", "fill", "font", "font_size", "align"]
+        bulk_keys = ["stroke", "stroke_width", "alpha", "fill", "font", "font_size", "align", "update_rate"]
         self.canvas_view.apply_settings_to_selected(bulk_keys)
         self._mark_dirty()
 
@@ -896,6 +947,7 @@ class EgpApp:
         self.font_var.set(shape.font or config.DEFAULT_FONT)
         self.font_size_var.set(shape.font_size)
         self.align_var.set(shape.align)
+        self.update_rate_var.set(shape.update_rate)
         center = self.canvas_view.selection_center_offset()
         if center:
             self._center_x_var.set(f"{center[0]:.1f}")
@@ -1007,7 +1059,7 @@ class EgpApp:
             return
         self.inputs_list.delete(0, tk.END)
         for input_def in self.project.inputs:
-            self.inputs_list.insert(tk.END, f"{input_def.name}:{input_def.type}")
+            self.inputs_list.insert(tk.END, f"{input_def.name}:{input_def.type}:{input_def.rate}ms")
 
     def _select_active_layer(self) -> None:
         """Description: Select active layer
@@ -1188,15 +1240,29 @@ class EgpApp:
         """Description: Add input
         Inputs: None
         """
-        value = simpledialog.askstring("Add Input", "Enter input as NAME:TYPE (Normal or String):", parent=self.root)
+        value = simpledialog.askstring(
+            "Add Input",
+            "Enter input as NAME:TYPE (Normal or String), optionally NAME:TYPE:RATE_MS:",
+            parent=self.root,
+        )
         if not value:
             return
         parts = value.split(":")
-        if len(parts) != 2:
-            messagebox.showerror("Input", "Format must be NAME:TYPE.")
+        if len(parts) not in (2, 3):
+            messagebox.showerror("Input", "Format must be NAME:TYPE or NAME:TYPE:RATE_MS.")
             return
         name = parts[0].strip()
         input_type = parts[1].strip().capitalize()
+        rate = 100
+        if len(parts) == 3:
+            try:
+                rate = int(parts[2].strip())
+            except ValueError:
+                messagebox.showerror("Input", "Rate must be a whole number of milliseconds.")
+                return
+            if rate < 10:
+                messagebox.showerror("Input", "Rate must be at least 10ms.")
+                return
         if input_type not in ("Normal", "String"):
             messagebox.showerror("Input", "Type must be Normal or String.")
             return
@@ -1206,10 +1272,11 @@ class EgpApp:
         for existing in self.project.inputs:
             if existing.name == name:
                 existing.type = input_type
+                existing.rate = rate
                 self._refresh_inputs()
                 self._mark_dirty()
                 return
-        self.project.inputs.append(InputDef(name=name, type=input_type))
+        self.project.inputs.append(InputDef(name=name, type=input_type, rate=rate))
         self._refresh_inputs()
         self._mark_dirty()
 
@@ -1303,30 +1370,318 @@ class EgpApp:
         )
         if not path:
             return
-        exporter = HudExporter(path)
-        exporter.export(self.project)
-        messagebox.showinfo("Export", "HUD exported successfully.")
+        exporter = self._make_exporter()
+        # Re-exporting over an earlier script keeps every surviving shape on its egp id.
+        exporter.base_manifest = load_manifest(manifest_path(path))
+        data = self._export_with_ids(exporter.export_to_string)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(data)
+        save_manifest(exporter.manifest, manifest_path(path))
+        if self._write_id_map_var.get():
+            save_id_map(exporter.manifest, id_map_path(path))
+        messagebox.showinfo("Export", "HUD exported successfully." + self._export_report_text(exporter, data))
+
+    def export_patch(self) -> None:
+        """Description: Write a script that updates the screen left by an earlier export instead of redrawing it
+        Inputs: None
+        """
+        base_path = filedialog.askopenfilename(
+            title="Previously Exported HUD",
+            filetypes=[("Text", "*.txt")],
+        )
+        if not base_path:
+            return
+        previous = load_manifest(manifest_path(base_path))
+        if previous is None:
+            messagebox.showerror("Export Patch", "No export manifest found next to that HUD. Export it once first.")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Patch",
+            defaultextension=".txt",
+            filetypes=[("Text", "*.txt")],
+        )
+        if not path:
+            return
+        exporter = self._make_exporter()
+        data = self._export_with_ids(lambda project: exporter.export_patch_to_string(project, previous))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(data)
+        if self._write_id_map_var.get():
+            save_id_map(exporter.manifest, id_map_path(base_path))
+        # Once the patch has run the screen matches this export, so later patches diff against it.
+        save_manifest(exporter.manifest, manifest_path(base_path))
+        save_manifest(exporter.manifest, manifest_path(path))
+        messagebox.showinfo("Export Patch", "Patch exported successfully." + self._export_report_text(exporter, data))
 
     def copy_hud_to_clipboard(self) -> None:
         """Description: Copy hud to clipboard
         Inputs: None
         """
-        fd, path = tempfile.mkstemp(suffix=".txt")
-        os.close(fd)
-        try:
-            exporter = HudExporter(path)
-            exporter.export(self.project)
-            with open(path, "r", encoding="utf-8") as file:
-                data = file.read()
-        finally:
-            try:
-                os.remove(path)
-            except OSError:
-                pass
+        exporter = self._make_exporter()
+        data = self._export_with_ids(exporter.export_to_string)
         self.root.clipboard_clear()
         self.root.clipboard_append(data)
         self.root.update()
-        messagebox.showinfo("Clipboard", "HUD copied to clipboard.")
+        messagebox.showinfo("Clipboard", "HUD copied to clipboard." + self._export_report_text(exporter, data))
+
+    def export_for_targets(self) -> None:
+        """Description: Export one script per target profile (resolution, precision, options) without rescaling the project
+        Inputs: None
+        """
+        profiles_path = filedialog.askopenfilename(
+            title="Target Profiles",
+            filetypes=[("JSON", "*.json")],
+        )
+        if not profiles_path:
+            return
+        try:
+            targets = load_targets(profiles_path)
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as exc:
+            messagebox.showerror("Export for Targets", f"Could not read target profiles:\n{exc}")
+            return
+        out_dir = filedialog.askdirectory(title="Export Targets To")
+        if not out_dir:
+            return
+        options = self._make_exporter().options
+        results = export_targets(self.project, targets, options, workers=min(len(targets), os.cpu_count() or 1))
+        lines = []
+        for result in results:
+            path = os.path.join(out_dir, f"{result.target.name}.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(result.code)
+            resolution = result.target.resolution
+            lines.append(f"{result.target.name} ({resolution[0]}x{resolution[1]}): {len(result.code)} chars, {result.report.objects_after} objects")
+        messagebox.showinfo("Export for Targets", f"Exported {len(results)} targets.\n\n" + "\n".join(lines))
+
+    def _export_with_ids(self, export: Callable[[Project], str]) -> str:
+        """Description: Run an export; ids the allocator hands out are stored in the project, so mark it unsaved when they change
+        Inputs: export: Callable[[Project], str]
+        """
+        before = self.project.egp_ids.to_dict()
+        data = export(self.project)
+        if self.project.egp_ids.to_dict() != before:
+            self.is_dirty = True
+            self._update_status()
+        return data
+
+    def compact_egp_ids(self) -> None:
+        """Description: Renumber the project's stable egp ids 1..N in layer order, dropping the free list
+        Inputs: None
+        """
+        shape_ids = [shape.id for layer in self.project.layers for shape in layer.shapes]
+        if not messagebox.askyesno(
+            "Compact EGP Ids",
+            "Renumber every shape's EGP id in layer order?\nScripts that look objects up by id will need the new id map.",
+        ):
+            return
+        changed = self.project.egp_ids.compact(shape_ids)
+        if changed:
+            self._mark_dirty()
+        messagebox.showinfo("Compact EGP Ids", f"{changed} shapes were given a new EGP id.")
+
+    def _make_exporter(self) -> HudExporter:
+        """Description: Build an exporter using the options selected in the Export menu
+        Inputs: None
+        """
+        options = ExportOptions(
+            optimize_vectors=self._optimize_vectors_var.get(),
+            fuse_calls=self._fuse_calls_var.get(),
+            dynamic_updates="changed" if self._changed_updates_var.get() else "interval",
+            init_objects_per_tick=self._init_objects_per_tick,
+            init_ops_per_tick=self._init_ops_per_tick,
+            pack_objects=self._pack_objects_var.get(),
+            cull_occluded=self._cull_occluded_var.get(),
+            drop_dead_shapes=self._drop_dead_var.get(),
+            simplify_tolerance=self._simplify_tolerance,
+            max_poly_vertices=self._max_poly_vertices,
+            parent_layers=self._parent_layers_var.get(),
+            watch_resolution=self._watch_resolution_var.get(),
+            table_emission=self._table_emission_var.get(),
+            minify=self._minify_var.get(),
+            stable_ids=self._stable_ids_var.get(),
+        )
+        return HudExporter(path, cache=self._snippet_cache, options=options)
+
+    def _export_report_text(self, exporter: HudExporter, data: str) -> str:
+        """Description: Summarise the exporter report and estimated chip cost for the export message box
+        Inputs: exporter: HudExporter, data: str
+        """
+        report = exporter.report
+        lines = [format_report(estimate_cost(data, names=report.minified.names)), ""]
+        if report.ops_saved or report.chars_saved:
+            lines.append(
+                f"Optimisations saved {report.ops_saved} ops, {report.chars_saved} chars "
+                f"({report.calls_removed} calls removed, {report.hoisted} vectors hoisted)"
+            )
+        if report.dead_shapes.total:
+            lines.append(f"Dropped {report.dead_shapes.total} dead shapes: {self._dead_counts_text(report.dead_shapes.counts())}")
+        if report.vertices_removed:
+            lines.append(f"Simplified polys: {report.vertices_removed} vertices removed, max deviation {report.max_deviation:.2f}px")
+        if self.project.precision != PrecisionPolicy():
+            lines.append(
+                f"Precision: max position error {report.max_position_error:.3f}px, "
+                f"max size error {report.max_size_error:.3f}px"
+            )
+        if report.minified.pretty_chars:
+            lines.append(
+                f"Minified {report.minified.pretty_chars} -> {report.minified.minified_chars} chars "
+                f"({report.minified.ratio:.0%} of pretty)"
+            )
+        if report.table_objects:
+            lines.append(f"Table-driven: {report.table_objects} objects packed, {report.table_chars_saved} chars saved")
+        if report.polys_split:
+            lines.append(f"Split {report.polys_split} polys into convex pieces")
+        if report.patch_removed or report.patch_created or report.patch_updated or report.patch_unchanged:
+            lines.append(
+                f"Patch: {report.patch_removed} removed, {report.patch_created} created, "
+                f"{report.patch_updated} updated, {report.patch_unchanged} unchanged"
+            )
+        if report.culled_ids:
+            preview = ", ".join(report.culled_ids[:5])
+            more = f" (+{len(report.culled_ids) - 5} more)" if len(report.culled_ids) > 5 else ""
+            lines.append(f"Culled {len(report.culled_ids)} hidden shapes: {preview}{more}")
+        if report.objects_after != report.objects_before:
+            lines.append(
+                f"Objects packed {report.objects_before} -> {report.objects_after} "
+                f"({report.merged_boxes} box merges, {report.collapsed_rects} line rectangles)"
+            )
+        return "\n\n" + "\n".join(lines).rstrip()
+
+    def _dead_counts_text(self, counts: dict[str, int]) -> str:
+        """Description: Format dead shape counts per reason
+        Inputs: counts: dict[str, int]
+        """
+        return ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in counts.items())
+
+    def show_dead_shape_lint(self) -> None:
+        """Description: Report shapes on visible layers that can never be seen, without exporting
+        Inputs: None
+        """
+        items = [(layer.color, shape) for layer in self.project.layers if layer.visible for shape in layer.shapes]
+        _kept, report = eliminate_dead(items, self.project.resolution)
+        if not report.total:
+            messagebox.showinfo("Lint", "No dead shapes found.")
+            return
+        messagebox.showinfo("Lint", f"{report.total} shapes can never be seen:\n{self._dead_counts_text(report.counts())}")
+
+    def configure_staged_init(self) -> None:
+        """Description: Prompt for the per-tick limits used to stage object creation
+        Inputs: None
+        """
+        objects = simpledialog.askinteger(
+            "Staged Initialization",
+            "Objects created per tick (0 = everything in first()):",
+            parent=self.root,
+            initialvalue=self._init_objects_per_tick,
+            minvalue=0,
+        )
+        if objects is None:
+            return
+        ops = simpledialog.askinteger(
+            "Staged Initialization",
+            "Estimated ops per tick (0 = no limit):",
+            parent=self.root,
+            initialvalue=self._init_ops_per_tick,
+            minvalue=0,
+        )
+        if ops is None:
+            return
+        self._init_objects_per_tick = objects
+        self._init_ops_per_tick = ops
+
+    def configure_simplify_tolerance(self) -> None:
+        """Description: Prompt for the poly simplification tolerance applied at export
+        Inputs: None
+        """
+        tolerance = simpledialog.askfloat(
+            "Poly Simplification",
+            "Max vertex deviation in pixels (0 = off):",
+            parent=self.root,
+            initialvalue=self._simplify_tolerance,
+            minvalue=0.0,
+        )
+        if tolerance is not None:
+            self._simplify_tolerance = tolerance
+
+    def configure_precision(self) -> None:
+        """Description: Prompt for the project's export precision policy
+        Inputs: None
+        """
+        policy = self.project.precision
+        decimals = simpledialog.askinteger(
+            "Precision",
+            "Decimal places in exported numbers:",
+            parent=self.root,
+            initialvalue=policy.decimals,
+            minvalue=0,
+            maxvalue=6,
+        )
+        if decimals is None:
+            return
+        snap = simpledialog.askstring(
+            "Precision",
+            "Snap coordinates and sizes to pixels (none, whole, half):",
+            parent=self.root,
+            initialvalue=policy.snap,
+        )
+        if snap is None:
+            return
+        snap = snap.strip().lower()
+        if snap not in ("none", "whole", "half"):
+            messagebox.showerror("Precision", "Snap must be none, whole or half.")
+            return
+        tolerance = simpledialog.askfloat(
+            "Precision",
+            "Snap values within this many pixels of an integer (0 = off):",
+            parent=self.root,
+            initialvalue=policy.integer_tolerance,
+            minvalue=0.0,
+            maxvalue=0.5,
+        )
+        if tolerance is None:
+            return
+        updated = PrecisionPolicy(decimals=decimals, snap=snap, integer_tolerance=tolerance)
+        if updated != policy:
+            self.project.precision = updated
+            self._mark_dirty()
+
+    def configure_poly_vertex_limit(self) -> None:
+        """Description: Prompt for the vertex limit used to split concave or oversized polys at export
+        Inputs: None
+        """
+        limit = simpledialog.askinteger(
+            "Poly Vertex Limit",
+            "Max vertices per exported poly (0 = emit polys as drawn):",
+            parent=self.root,
+            initialvalue=self._max_poly_vertices,
+            minvalue=0,
+        )
+        if limit is None:
+            return
+        self._max_poly_vertices = max(3, limit) if limit else 0
+
+    def simplify_selected_polys(self) -> None:
+        """Description: Simplify the selected polys in the editor and report what changed
+        Inputs: None
+        """
+        tolerance = simpledialog.askfloat(
+            "Simplify Poly",
+            "Max vertex deviation in pixels:",
+            parent=self.root,
+            initialvalue=self._simplify_tolerance or 1.0,
+            minvalue=0.0,
+        )
+        if tolerance is None:
+            return
+        report = self.canvas_view.simplify_selected(tolerance)
+        if not report.vertices_before:
+            messagebox.showinfo("Simplify Poly", "Select one or more polys first.")
+            return
+        messagebox.showinfo(
+            "Simplify Poly",
+            f"Removed {report.vertices_removed} of {report.vertices_before} vertices "
+            f"(max deviation {report.max_deviation:.2f}px).",
+        )
 
     def _mark_dirty(self) -> None:
         """Description: Mark dirty
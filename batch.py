@@ -0,0 +1,241 @@
+"""Headless batch export of HUD projects, for build pipelines."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+from hashlib import sha1
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+
+import config
+from exporter import ExportOptions, HudExporter
+from storage import load_manifest, load_project, manifest_path, save_manifest
+from targets import ExportTarget, export_targets, load_targets
+
+# Default hash-mode state file, relative to the working directory.
+STATE_FILE = ".e2hud_batch.json"
+
+
+class BatchJob(NamedTuple):
+    source: str
+    target: str
+    options: Dict
+    # Content hash of the project and options (hash mode only).
+    digest: str = ""
+    # Serialised target profiles; when set, one script per target replaces the single script.
+    targets: Tuple[Dict, ...] = ()
+
+
+class BatchResult(NamedTuple):
+    job: BatchJob
+    seconds: float = 0.0
+    objects: int = 0
+    chars: int = 0
+    error: str = ""
+
+
+def find_projects(paths: List[str]) -> Iterator[str]:
+    """Description: Project files named directly, or found under named directories, in a stable order
+    Inputs: paths: List[str]
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(config.PROJECT_EXTENSION):
+                    yield os.path.join(root, name)
+
+
+def target_path(source: str, out_dir: Optional[str]) -> str:
+    """Description: Output script path: the project name with .txt, next to the project or in out_dir
+    Inputs: source: str, out_dir: Optional[str]
+    """
+    name = os.path.basename(source)
+    if name.endswith(config.PROJECT_EXTENSION):
+        name = name[: -len(config.PROJECT_EXTENSION)]
+    return os.path.join(out_dir or os.path.dirname(source), name + ".txt")
+
+
+def job_outputs(job: BatchJob) -> List[str]:
+    """Description: Script paths a job writes: its target path, or name.<target>.txt per profile
+    Inputs: job: BatchJob
+    """
+    if not job.targets:
+        return [job.target]
+    stem = job.target[: -len(".txt")]
+    return [f"{stem}.{target['name']}.txt" for target in job.targets]
+
+
+def job_digest(source: str, options: Dict, targets: Tuple[Dict, ...] = ()) -> str:
+    """Description: Hash of the project file, export options and targets; a match means the output would be identical
+    Inputs: source: str, options: Dict, targets: Tuple[Dict, ...] = ()
+    """
+    digest = sha1(json.dumps([options, list(targets)], sort_keys=True).encode("utf-8"))
+    with open(source, "rb") as file:
+        digest.update(file.read())
+    return digest.hexdigest()
+
+
+def is_current(job: BatchJob, skip: str, state: Dict[str, str]) -> bool:
+    """Description: Whether the job's output is up to date under the skip mode (mtime, hash or none)
+    Inputs: job: BatchJob, skip: str, state: Dict[str, str]
+    """
+    outputs = job_outputs(job)
+    if skip == "none" or not all(os.path.exists(path) for path in outputs):
+        return False
+    if skip == "mtime":
+        return min(os.path.getmtime(path) for path in outputs) >= os.path.getmtime(job.source)
+    return state.get(os.path.abspath(job.source)) == job.digest
+
+
+def export_one(job: BatchJob) -> BatchResult:
+    """Description: Load, export and write one project; runs in a worker process
+    Inputs: job: BatchJob
+    """
+    start = time.perf_counter()
+    if job.targets:
+        return _export_targets(job, start)
+    try:
+        project = load_project(job.source)
+        exporter = HudExporter(options=ExportOptions(**job.options), manifest=load_manifest(manifest_path(job.target)))
+        data = exporter.export_to_string(project)
+        with open(job.target, "w", encoding="utf-8") as file:
+            file.write(data)
+        save_manifest(exporter.manifest, manifest_path(job.target))
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        return BatchResult(job, time.perf_counter() - start, error=f"{type(exc).__name__}: {exc}")
+    return BatchResult(job, time.perf_counter() - start, exporter.report.objects_after, len(data))
+
+
+def _export_targets(job: BatchJob, start: float) -> BatchResult:
+    """Description: Export one project once per target profile; the batch pool already parallelises across files
+    Inputs: job: BatchJob, start: float
+    """
+    try:
+        project = load_project(job.source)
+        targets = [ExportTarget.from_dict(target) for target in job.targets]
+        results = export_targets(project, targets, ExportOptions(**job.options))
+        for path, result in zip(job_outputs(job), results):
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(result.code)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        return BatchResult(job, time.perf_counter() - start, error=f"{type(exc).__name__}: {exc}")
+    objects = sum(result.report.objects_after for result in results)
+    chars = sum(len(result.code) for result in results)
+    return BatchResult(job, time.perf_counter() - start, objects, chars)
+
+
+def run_batch(jobs: List[BatchJob], workers: int) -> Iterator[BatchResult]:
+    """Description: Export jobs across a process pool, yielding results as they finish (inline for one worker)
+    Inputs: jobs: List[BatchJob], workers: int
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield export_one(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(export_one, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def add_option_arguments(parser: argparse.ArgumentParser) -> None:
+    """Description: One flag per ExportOptions field, typed from its default
+    Inputs: parser: argparse.ArgumentParser
+    """
+    defaults = ExportOptions()
+    group = parser.add_argument_group("export options")
+    for option in fields(ExportOptions):
+        default = getattr(defaults, option.name)
+        flag = "--" + option.name.replace("_", "-")
+        if isinstance(default, bool):
+            group.add_argument(flag, dest=option.name, action=argparse.BooleanOptionalAction, default=default)
+        else:
+            group.add_argument(flag, dest=option.name, type=type(default), default=default)
+
+
+def option_values(args: argparse.Namespace) -> Dict:
+    """Description: ExportOptions fields from parsed arguments
+    Inputs: args: argparse.Namespace
+    """
+    names = {option.name for option in fields(ExportOptions)}
+    return {name: value for name, value in vars(args).items() if name in names}
+
+
+def _load_state(path: str) -> Dict[str, str]:
+    """Description: Hash-mode state: absolute project path -> digest of the last successful export
+    Inputs: path: str
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Description: Export every given project without the editor and report per-file timing and throughput
+    Inputs: argv: Optional[List[str]] = None
+    """
+    parser = argparse.ArgumentParser(description="Export HUD projects to E2 scripts without the editor.")
+    parser.add_argument("paths", nargs="+", help=f"{config.PROJECT_EXTENSION} projects or directories to search")
+    parser.add_argument("-o", "--out-dir", help="write scripts here instead of next to each project")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip", choices=("mtime", "hash", "none"), default="mtime", help="how to detect unchanged projects")
+    parser.add_argument("--state", default=STATE_FILE, help="hash-mode state file")
+    parser.add_argument("--targets", help="JSON list of target profiles; writes name.<target>.txt per profile")
+    add_option_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = option_values(args)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    state = _load_state(args.state) if args.skip == "hash" else {}
+    targets = tuple(target.to_dict() for target in load_targets(args.targets)) if args.targets else ()
+    jobs = []
+    skipped = 0
+    for source in find_projects(args.paths):
+        digest = job_digest(source, options, targets) if args.skip == "hash" else ""
+        job = BatchJob(source, target_path(source, args.out_dir), options, digest, targets)
+        if is_current(job, args.skip, state):
+            skipped += 1
+            print(f"{source}: unchanged, skipped")
+        else:
+            jobs.append(job)
+
+    start = time.perf_counter()
+    exported = failed = objects = chars = 0
+    for result in run_batch(jobs, args.workers):
+        job = result.job
+        if result.error:
+            failed += 1
+            print(f"{job.source}: FAILED {result.error}")
+            continue
+        exported += 1
+        objects += result.objects
+        chars += result.chars
+        if job.digest:
+            state[os.path.abspath(job.source)] = job.digest
+        print(f"{job.source} -> {', '.join(job_outputs(job))}: {result.seconds * 1000:.1f} ms, {result.objects} objects, {result.chars} chars")
+    elapsed = time.perf_counter() - start
+
+    if args.skip == "hash" and exported:
+        with open(args.state, "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=2, sort_keys=True)
+    elapsed = max(elapsed, 1e-9)
+    print(
+        f"{exported} exported, {skipped} skipped, {failed} failed in {elapsed:.2f}s "
+        f"({exported / elapsed:.1f} files/s, {objects / elapsed:.0f} objects/s, {chars / elapsed:.0f} chars/s, {args.workers} workers)"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
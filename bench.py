@@ -0,0 +1,189 @@
+"""Export and project I/O benchmarks on deterministic synthetic projects."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field, replace
+from math import cos, sin, tau
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from exporter import HudExporter, SnippetCache
+from model import InputDef, Layer, Project, Shape
+from storage import load_project, save_project
+
+SIZES = (100, 1_000, 10_000, 100_000)
+OPERATIONS = ("export", "export_warm", "to_dict", "from_dict", "save", "load")
+# Timings below this many seconds are too noisy to flag as regressions.
+NOISE_FLOOR = 0.002
+
+
+@dataclass
+class SyntheticSpec:
+    shapes: int = 1_000
+    # Relative weight of each shape kind.
+    kinds: Dict[str, float] = field(default_factory=lambda: {
+        "line": 3, "rect": 2, "box": 3, "circle": 1, "circle_filled": 1, "poly": 1, "text": 2,
+    })
+    poly_vertices: Tuple[int, int] = (3, 12)
+    # Fraction of text shapes that reference an input and are re-sent at runtime.
+    dynamic_ratio: float = 0.25
+    layers: int = 4
+    resolution: Tuple[int, int] = (1920, 1080)
+    seed: int = 1
+
+
+def synthetic_project(spec: SyntheticSpec) -> Project:
+    """Description: Project with spec.shapes shapes spread over spec.layers layers; identical for identical specs
+    Inputs: spec: SyntheticSpec
+    """
+    rng = random.Random(spec.seed)
+    width, height = spec.resolution
+    inputs = [InputDef("Speed", "Normal", 100), InputDef("Ammo", "Normal", 200), InputDef("Mode", "String", 500)]
+    kinds = list(spec.kinds)
+    weights = [spec.kinds[kind] for kind in kinds]
+    layer_count = max(1, spec.layers)
+    layers = [Layer(id=f"layer-{index}", name=f"Layer {index + 1}") for index in range(layer_count)]
+    colors = ["#FFFFFF", "#FFBF00", "#32D74B", "#0A84FF", "#FF4D4D"]
+    for index in range(spec.shapes):
+        kind = rng.choices(kinds, weights)[0]
+        x = round(rng.uniform(0, width), 2)
+        y = round(rng.uniform(0, height), 2)
+        w = round(rng.uniform(2, width / 8), 2)
+        h = round(rng.uniform(2, height / 8), 2)
+        shape = Shape(
+            id=f"shape-{index}",
+            kind=kind,
+            points=[(x, y), (x + w, y + h)],
+            stroke=rng.choice(colors),
+            stroke_width=rng.randint(1, 4),
+            alpha=rng.choice((255, 255, 255, 200, 128)),
+        )
+        if kind in ("box", "circle_filled", "poly"):
+            shape.fill = rng.choice(colors)
+        if kind == "poly":
+            count = rng.randint(*spec.poly_vertices)
+            radius = min(w, h) / 2
+            shape.points = [
+                (round(x + radius * rng.uniform(0.6, 1.0) * cos(tau * step / count), 2),
+                 round(y + radius * rng.uniform(0.6, 1.0) * sin(tau * step / count), 2))
+                for step in range(count)
+            ]
+        elif kind == "text":
+            shape.points = [(x, y)]
+            shape.font_size = rng.choice((12, 18, 24))
+            if rng.random() < spec.dynamic_ratio:
+                shape.text = rng.choice(("SPD %Speed%R1", "AMMO %Ammo%", "%Mode%"))
+            else:
+                shape.text = f"Label {index}"
+        layers[index % layer_count].shapes.append(shape)
+    return Project(resolution=spec.resolution, layers=layers, active_layer_id=layers[0].id, inputs=inputs)
+
+
+def best_of(action: Callable[[], object], repeat: int) -> float:
+    """Description: Fastest wall time of repeat runs, in seconds
+    Inputs: action: Callable[[], object], repeat: int
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_size(spec: SyntheticSpec, repeat: int, workdir: str) -> Dict[str, float]:
+    """Description: Time every operation on one synthetic project
+    Inputs: spec: SyntheticSpec, repeat: int, workdir: str
+    """
+    project = synthetic_project(spec)
+    payload = project.to_dict()
+    path = os.path.join(workdir, f"bench_{spec.shapes}.e2hud.json")
+    cache = SnippetCache(max_entries=spec.shapes + 1)
+    HudExporter(cache=cache).export_to_string(project)
+    results = {
+        "export": best_of(lambda: HudExporter().export_to_string(project), repeat),
+        "export_warm": best_of(lambda: HudExporter(cache=cache).export_to_string(project), repeat),
+        "to_dict": best_of(project.to_dict, repeat),
+        "from_dict": best_of(lambda: Project.from_dict(payload), repeat),
+        "save": best_of(lambda: save_project(project, path), repeat),
+        "load": best_of(lambda: load_project(path), repeat),
+    }
+    os.remove(path)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Description: Operations slower than the baseline by more than threshold (a fraction), ignoring sub-noise timings
+    Inputs: results: Dict, baseline: Dict, threshold: float
+    """
+    regressions = []
+    for size, timings in results["timings"].items():
+        for operation, seconds in timings.items():
+            before = baseline.get("timings", {}).get(size, {}).get(operation)
+            if before is None or max(seconds, before) < NOISE_FLOOR:
+                continue
+            if seconds > before * (1 + threshold):
+                regressions.append(f"{operation} @ {size} shapes: {before * 1000:.1f} ms -> {seconds * 1000:.1f} ms (+{seconds / before - 1:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Description: Run the benchmarks, write JSON results and fail on regressions against a baseline
+    Inputs: argv: Optional[List[str]] = None
+    """
+    parser = argparse.ArgumentParser(description="Benchmark export and project I/O on synthetic projects.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation; the fastest is kept")
+    parser.add_argument("--layers", type=int, default=SyntheticSpec.layers)
+    parser.add_argument("--kinds", help="kind weights, e.g. box=3,text=1 (default: a mix of every kind)")
+    parser.add_argument("--poly-vertices", type=int, nargs=2, default=list(SyntheticSpec.poly_vertices), metavar=("MIN", "MAX"))
+    parser.add_argument("--dynamic-ratio", type=float, default=SyntheticSpec.dynamic_ratio)
+    parser.add_argument("--seed", type=int, default=SyntheticSpec.seed)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="results JSON from an earlier commit to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    base = SyntheticSpec(
+        layers=args.layers,
+        poly_vertices=(args.poly_vertices[0], args.poly_vertices[1]),
+        dynamic_ratio=args.dynamic_ratio,
+        seed=args.seed,
+    )
+    if args.kinds:
+        base.kinds = {name: float(weight) for name, _, weight in (item.partition("=") for item in args.kinds.split(","))}
+    results: Dict = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "spec": {**asdict(base), "shapes": args.sizes},
+        "timings": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            spec = replace(base, shapes=size)
+            timings = bench_size(spec, args.repeat, workdir)
+            results["timings"][str(size)] = timings
+            print(f"{size:>7} shapes  " + "  ".join(f"{name} {timings[name] * 1000:9.1f} ms" for name in OPERATIONS))
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
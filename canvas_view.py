@@ -7,6 +7,7 @@ import tkinter as tk
 import tkinter.font as tkfont
 
 import config
+from export_passes import SimplifyReport, simplify_polygon
 from model import Project, Shape
 
 
@@ -39,6 +40,7 @@ class CanvasView:
             "font": config.DEFAULT_FONT,
             "font_size": config.DEFAULT_FONT_SIZE,
             "align": "left",
+            "update_rate": 0,
         }
 
         self.active_layer_id = project.active_layer_id
@@ -171,6 +173,8 @@ class CanvasView:
                 shape.font_size = int(self.settings["font_size"])
             if key_set is None or "align" in key_set:
                 shape.align = str(self.settings.get("align", "left"))
+            if (key_set is None or "update_rate" in key_set) and shape.kind == "text":
+                shape.update_rate = max(0, int(self.settings.get("update_rate", 0)))
         self.draw()
         self._notify_project_changed()
 
@@ -849,6 +853,7 @@ class CanvasView:
             font=str(self.settings["font"]),
             font_size=int(self.settings["font_size"]),
             align=str(self.settings.get("align", "left")),
+            update_rate=max(0, int(self.settings.get("update_rate", 0))),
         )
         layer = self.project.get_layer(self.active_layer_id)
         if not layer:
@@ -1099,6 +1104,24 @@ class CanvasView:
         self.draw()
         self._notify_project_changed()
 
+    def simplify_selected(self, tolerance: float) -> SimplifyReport:
+        """Description: Simplify the selected polys in place
+        Inputs: tolerance: float
+        """
+        report = SimplifyReport()
+        if not self._selected_shape_ids:
+            return report
+        for shape in self._iter_shapes():
+            if shape.id not in self._selected_shape_ids or shape.kind != "poly":
+                continue
+            points, deviation = simplify_polygon(shape.points, tolerance)
+            report.add(len(shape.points), len(points), deviation)
+            shape.points = points
+        if report.vertices_removed:
+            self.draw()
+            self._notify_project_changed()
+        return report
+
     def _ctrl_down(self, event: tk.Event) -> bool:
         """Description: Ctrl down
         Inputs: event: tk.Event
@@ -0,0 +1,522 @@
+# Static cost model for generated Expression2 EGP code.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import re
+import sys
+
+# Relative op weights per call. These approximate the E2 ops counter and are meant for
+# comparing exports and catching budget blowouts, not for exact in-game numbers.
+CALL_WEIGHTS: Dict[str, int] = {
+    "egpClear": 20,
+    "egpBox": 15,
+    "egpBoxOutline": 15,
+    "egpCircle": 15,
+    "egpCircleOutline": 15,
+    "egpLine": 15,
+    "egpPoly": 25,
+    "egpText": 20,
+    "egpSetText": 15,
+    "egpColor": 10,
+    "egpAlpha": 10,
+    "egpAlign": 10,
+    "egpFont": 10,
+    "egpSize": 10,
+    "egpPos": 10,
+    "egpParent": 10,
+    "egpRemove": 10,
+    "egpScrSize": 5,
+    "vec": 2,
+    "vec2": 2,
+    "vec4": 2,
+    "array": 2,
+    "table": 2,
+    "round": 2,
+    "interval": 5,
+}
+DEFAULT_CALL_WEIGHT = 2
+# Extra weight per element passed to egpPoly's vertex array.
+POLY_VERTEX_WEIGHT = 2
+VECTOR_OP_WEIGHT = 3
+CONCAT_WEIGHT = 3
+ARITH_WEIGHT = 1
+ASSIGN_WEIGHT = 1
+LOGIC_WEIGHT = 1
+
+# Calls that create an EGP object.
+CREATE_CALLS = {"egpBox", "egpBoxOutline", "egpCircle", "egpCircleOutline", "egpLine", "egpPoly", "egpText"}
+
+# Variables the exporter declares as vector2.
+VECTOR_NAMES = {"Res", "ProjRes", "Scale"}
+VECTOR_CTORS = {"vec", "vec2", "vec4"}
+
+_TOKEN_RE = re.compile(
+    r'"(?:\\.|[^"\\])*"'
+    r"|\d+(?:\.\d*)?"
+    r"|[A-Za-z_]\w*"
+    r"|==|!=|>=|<=|\+=|-=|\*=|/=|\+\+|--"
+    r"|[-+*/%&|!~()<>=,:{}\[\]]"
+)
+_HOISTED_RE = re.compile(r"V\d+$")
+_BINARY_OPS = {"+", "-", "*", "/", "%"}
+_ASSIGN_OPS = {"=", "+=", "-=", "*=", "/=", "++", "--"}
+_LOGIC_OPS = {"==", "!=", ">=", "<=", "<", ">", "&", "|", "!", "~"}
+
+
+@dataclass
+class CostReport:
+    chars: int = 0
+    first_tick_ops: int = 0
+    init_stage_ops: List[int] = field(default_factory=list)
+    dynamic_tick_ops: int = 0
+    object_count: int = 0
+    settext_per_second: float = 0.0
+
+    @property
+    def max_tick_ops(self) -> int:
+        """Description: Worst single execution across init stages and the dynamic block
+        Inputs: None
+        """
+        return max([self.dynamic_tick_ops, *self.init_stage_ops])
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {
+            "chars": self.chars,
+            "first_tick_ops": self.first_tick_ops,
+            "init_stage_ops": list(self.init_stage_ops),
+            "dynamic_tick_ops": self.dynamic_tick_ops,
+            "object_count": self.object_count,
+            "settext_per_second": round(self.settext_per_second, 3),
+        }
+
+
+@dataclass
+class CostBudget:
+    max_chars: Optional[int] = None
+    max_first_tick_ops: Optional[int] = None
+    max_tick_ops: Optional[int] = None
+    max_objects: Optional[int] = None
+    max_settext_per_second: Optional[float] = None
+
+
+def tokenize(code: str) -> List[str]:
+    """Description: Split E2 source into tokens, skipping @directive lines and comments
+    Inputs: code: str
+    """
+    body = "\n".join(line for line in code.splitlines() if not line.lstrip().startswith(("@", "#")))
+    return _TOKEN_RE.findall(body)
+
+
+def estimate_ops(code: str) -> int:
+    """Description: Weighted op estimate for a fragment of straight-line E2 code
+    Inputs: code: str
+    """
+    return _token_ops(tokenize(code))
+
+
+def estimate_cost(code: str, input_changes_per_second: float = 10.0, names: Optional[Dict[str, str]] = None) -> CostReport:
+    """Description: Analyse an exported script; ~Input guarded blocks are assumed to fire input_changes_per_second times a second. names is a minified export's rename map, used to read short names back
+    Inputs: code: str, input_changes_per_second: float = 10.0, names: Optional[Dict[str, str]] = None
+    """
+    report = CostReport(chars=len(code))
+    tokens = tokenize(code)
+    if names:
+        originals = {short: name for name, short in names.items()}
+        tokens = [originals.get(token, token) for token in tokens]
+    created: set[str] = set()
+    functions: Dict[str, _Function] = {}
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "function":
+            index = _read_function(tokens, index, functions)
+            continue
+        if token not in ("if", "elseif"):
+            index += 1
+            continue
+        cond, body, index = _split_block(tokens, index + 1)
+        cond_text = "".join(cond)
+        call_ops, call_objects = _function_calls(body, functions)
+        body_ops = _token_ops(cond) + _block_ops(body) + call_ops
+        if "first" in cond or re.search(r"Init==\d", cond_text):
+            report.init_stage_ops.append(body_ops)
+            report.object_count += _count_created(body, created) + call_objects
+            continue
+        if re.match(r'clk\("', cond_text):
+            # Named timers (the resize watcher) run a one-off layout pass, not the per-tick update.
+            continue
+        report.dynamic_tick_ops += body_ops
+        report.settext_per_second += _settext_rate(cond, body, input_changes_per_second)
+    report.first_tick_ops = report.init_stage_ops[0] if report.init_stage_ops else 0
+    return report
+
+
+def check_budget(report: CostReport, budget: CostBudget) -> List[str]:
+    """Description: List human-readable budget violations (empty when the script fits)
+    Inputs: report: CostReport, budget: CostBudget
+    """
+    checks = [
+        ("characters", report.chars, budget.max_chars),
+        ("first-tick ops", report.first_tick_ops, budget.max_first_tick_ops),
+        ("ops in one tick", report.max_tick_ops, budget.max_tick_ops),
+        ("EGP objects", report.object_count, budget.max_objects),
+        ("egpSetText calls per second", report.settext_per_second, budget.max_settext_per_second),
+    ]
+    problems = []
+    for label, value, limit in checks:
+        if limit is not None and value > limit:
+            problems.append(f"{label}: {value:g} exceeds budget {limit:g}")
+    return problems
+
+
+def _split_block(tokens: List[str], index: int) -> Tuple[List[str], List[str], int]:
+    """Description: Read "( cond ) { body }" starting at index; returns cond, body and the index after the block
+    Inputs: tokens: List[str], index: int
+    """
+    cond_start = index
+    depth = 0
+    while index < len(tokens):
+        if tokens[index] == "(":
+            depth += 1
+        elif tokens[index] == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        index += 1
+    cond = tokens[cond_start + 1:index]
+    while index < len(tokens) and tokens[index] != "{":
+        index += 1
+    body_start = index + 1
+    depth = 0
+    while index < len(tokens):
+        if tokens[index] == "{":
+            depth += 1
+        elif tokens[index] == "}":
+            depth -= 1
+            if depth == 0:
+                break
+        index += 1
+    return cond, tokens[body_start:index], index + 1
+
+
+def _block_ops(tokens: List[str]) -> int:
+    """Description: Ops of a block body, taking every nested branch (worst case)
+    Inputs: tokens: List[str]
+    """
+    return _token_ops([token for token in tokens if token not in ("if", "elseif", "else", "{", "}")])
+
+
+def _token_ops(tokens: List[str]) -> int:
+    """Description: Weighted ops of a flat token list
+    Inputs: tokens: List[str]
+    """
+    ops = 0
+    for index, token in enumerate(tokens):
+        nxt = tokens[index + 1] if index + 1 < len(tokens) else ""
+        prev = tokens[index - 1] if index > 0 else ""
+        if nxt == "(" and (token[0].isalpha() or token[0] == "_") and token not in ("if", "elseif", "while", "for"):
+            ops += CALL_WEIGHTS.get(token, DEFAULT_CALL_WEIGHT)
+            if token == "egpPoly":
+                ops += POLY_VERTEX_WEIGHT * _poly_vertices(tokens, index)
+        elif token in _BINARY_OPS and _is_operand_end(prev):
+            if prev.startswith('"') or nxt.startswith('"'):
+                ops += CONCAT_WEIGHT
+            elif _is_vector_left(tokens, index - 1) or _is_vector_name(nxt):
+                ops += VECTOR_OP_WEIGHT
+            else:
+                ops += ARITH_WEIGHT
+        elif token in _ASSIGN_OPS:
+            ops += ASSIGN_WEIGHT
+        elif token in _LOGIC_OPS:
+            ops += LOGIC_WEIGHT
+    return ops
+
+
+def _is_operand_end(token: str) -> bool:
+    """Description: Whether a token can end an operand (so a following +/- is binary)
+    Inputs: token: str
+    """
+    return bool(token) and (token == ")" or token == "]" or token[0] == '"' or token[0].isalnum() or token[0] == "_")
+
+
+def _is_vector_name(token: str) -> bool:
+    """Description: Vector variable or constructor name
+    Inputs: token: str
+    """
+    return token in VECTOR_NAMES or token in VECTOR_CTORS or bool(_HOISTED_RE.match(token))
+
+
+def _is_vector_left(tokens: List[str], index: int) -> bool:
+    """Description: Whether the operand ending at index is a vector (variable or vecN(...) call)
+    Inputs: tokens: List[str], index: int
+    """
+    if index < 0:
+        return False
+    if tokens[index] != ")":
+        return _is_vector_name(tokens[index])
+    depth = 0
+    while index >= 0:
+        if tokens[index] == ")":
+            depth += 1
+        elif tokens[index] == "(":
+            depth -= 1
+            if depth == 0:
+                return index > 0 and tokens[index - 1] in VECTOR_CTORS
+        index -= 1
+    return False
+
+
+def _poly_vertices(tokens: List[str], index: int) -> int:
+    """Description: Count top-level vertices in the array(...) passed to egpPoly at index
+    Inputs: tokens: List[str], index: int
+    """
+    try:
+        start = tokens.index("array", index) + 2
+    except ValueError:
+        return 0
+    depth = 1
+    count = 1
+    for token in tokens[start:]:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        elif token == "," and depth == 1:
+            count += 1
+    return count
+
+
+class _Function(NamedTuple):
+    params: List[str]
+    # Ops per call outside the loop.
+    ops: int
+    # Parameter bounding "for (I = 0, Param - 1)", or -1 without such a loop.
+    loop_param: int
+    # Ops per iteration, taking the costliest branch of each if/elseif/else chain.
+    loop_ops: int
+    # Objects created per iteration (branches are exclusive, so at most one).
+    loop_objects: int
+
+
+def _read_function(tokens: List[str], index: int, functions: Dict[str, _Function]) -> int:
+    """Description: Record a user function's per-call and per-iteration cost; returns the index after its body
+    Inputs: tokens: List[str], index: int, functions: Dict[str, _Function]
+    """
+    start = tokens.index("(", index)
+    name = tokens[start - 1]
+    params_tokens, body, end = _split_block(tokens, start - 1)
+    params = [token for token in params_tokens if token not in (",", ":") and token[0].isupper()]
+    loop_param, loop_ops, loop_objects = -1, 0, 0
+    rest = body
+    if "for" in body:
+        at = body.index("for")
+        bounds, loop, after = _split_block(body, at + 1)
+        comma = bounds.index(",") if "," in bounds else len(bounds)
+        bound = bounds[comma + 1:comma + 2]
+        if bound and bound[0] in params:
+            loop_param = params.index(bound[0])
+            loop_ops = _token_ops(bounds) + _chain_ops(loop)
+            loop_objects = 1 if any(token in CREATE_CALLS for token in loop) else 0
+            rest = body[:at] + body[after:]
+    functions[name] = _Function(params, _block_ops(rest), loop_param, loop_ops, loop_objects)
+    return end
+
+
+def _function_calls(tokens: List[str], functions: Dict[str, _Function]) -> Tuple[int, int]:
+    """Description: Ops and created objects of calls to known functions with a literal loop count
+    Inputs: tokens: List[str], functions: Dict[str, _Function]
+    """
+    ops = 0
+    objects = 0
+    for index, token in enumerate(tokens[:-1]):
+        function = functions.get(token)
+        if function is None or tokens[index + 1] != "(":
+            continue
+        args = _call_args(tokens, index + 1)
+        ops += function.ops
+        if 0 <= function.loop_param < len(args) and args[function.loop_param].isdigit():
+            count = int(args[function.loop_param])
+            ops += count * function.loop_ops
+            objects += count * function.loop_objects
+    return ops, objects
+
+
+def _call_args(tokens: List[str], index: int) -> List[str]:
+    """Description: Top-level arguments of the call whose "(" is at index, as single tokens (empty for compound ones)
+    Inputs: tokens: List[str], index: int
+    """
+    args: List[List[str]] = [[]]
+    depth = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "(":
+            depth += 1
+            if depth == 1:
+                index += 1
+                continue
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                break
+        if token == "," and depth == 1:
+            args.append([])
+        else:
+            args[-1].append(token)
+        index += 1
+    return ["".join(arg) if len(arg) == 1 else "" for arg in args]
+
+
+def _chain_ops(tokens: List[str]) -> int:
+    """Description: Ops of a block where each if/elseif/else chain costs its condition plus its costliest branch
+    Inputs: tokens: List[str]
+    """
+    ops = 0
+    flat: List[str] = []
+    index = 0
+    while index < len(tokens):
+        if tokens[index] != "if":
+            flat.append(tokens[index])
+            index += 1
+            continue
+        branches = []
+        while index < len(tokens) and tokens[index] in ("if", "elseif", "else"):
+            if tokens[index] == "else":
+                # "else" has no condition; give _split_block an empty one.
+                _cond, body, end = _split_block(["(", ")", *tokens[index + 1:]], 0)
+                index += end - 1
+                branches.append(_chain_ops(body))
+                break
+            cond, body, index = _split_block(tokens, index + 1)
+            ops += _token_ops(cond)
+            branches.append(_chain_ops(body))
+        ops += max(branches)
+    return ops + _token_ops(flat)
+
+
+def _count_created(tokens: List[str], created: set[str]) -> int:
+    """Description: Count newly created objects, de-duplicating literal ids
+    Inputs: tokens: List[str], created: set[str]
+    """
+    count = 0
+    for index, token in enumerate(tokens):
+        if token not in CREATE_CALLS or index + 2 >= len(tokens) or tokens[index + 1] != "(":
+            continue
+        egp_id = tokens[index + 2]
+        if egp_id.isdigit():
+            if egp_id in created:
+                continue
+            created.add(egp_id)
+        count += 1
+    return count
+
+
+def _settext_rate(cond: List[str], body: List[str], input_changes_per_second: float) -> float:
+    """Description: egpSetText calls per second for one top-level dynamic block
+    Inputs: cond: List[str], body: List[str], input_changes_per_second: float
+    """
+    if "clk" in cond and "~" not in cond:
+        per_tick = _bucketed_calls(body, "egpSetText")
+        interval = _interval_ms(body)
+        return per_tick * 1000.0 / interval if interval else 0.0
+    return body.count("egpSetText") * input_changes_per_second
+
+
+def _bucketed_calls(tokens: List[str], name: str) -> float:
+    """Description: Average calls per tick, dividing calls inside "Tick % K == 0" buckets by K
+    Inputs: tokens: List[str], name: str
+    """
+    total = 0.0
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token == "if":
+            cond, body, index = _split_block(tokens, index + 1)
+            every = 1
+            if "Tick" in cond and "%" in cond:
+                literal = cond[cond.index("%") + 1]
+                every = int(literal) if literal.isdigit() else 1
+            total += _bucketed_calls(body, name) / every
+            continue
+        if token == name:
+            total += 1
+        index += 1
+    return total
+
+
+def _interval_ms(tokens: List[str]) -> int:
+    """Description: First literal interval(...) period in a block
+    Inputs: tokens: List[str]
+    """
+    for index, token in enumerate(tokens[:-2]):
+        if token == "interval" and tokens[index + 1] == "(" and tokens[index + 2].isdigit():
+            return int(tokens[index + 2])
+    return 0
+
+
+def format_report(report: CostReport) -> str:
+    """Description: Multi-line summary for message boxes and CLI output
+    Inputs: report: CostReport
+    """
+    lines = [
+        f"Characters: {report.chars}",
+        f"EGP objects: {report.object_count}",
+        f"First-tick ops: ~{report.first_tick_ops}",
+    ]
+    if len(report.init_stage_ops) > 1:
+        lines.append(f"Init stages: {len(report.init_stage_ops)} (max ~{max(report.init_stage_ops)} ops)")
+    lines.append(f"Dynamic block ops per tick: ~{report.dynamic_tick_ops}")
+    lines.append(f"egpSetText per second: ~{report.settext_per_second:.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Description: CI entry point: estimate exported scripts or projects and fail on budget violations
+    Inputs: argv: Optional[List[str]] = None
+    """
+    import config
+    from exporter import HudExporter
+    from storage import load_project
+
+    parser = argparse.ArgumentParser(description="Estimate the E2 cost of exported HUD scripts.")
+    parser.add_argument("paths", nargs="+", help=f"exported .txt scripts or {config.PROJECT_EXTENSION} projects")
+    parser.add_argument("--max-chars", type=int)
+    parser.add_argument("--max-first-tick-ops", type=int)
+    parser.add_argument("--max-tick-ops", type=int)
+    parser.add_argument("--max-objects", type=int)
+    parser.add_argument("--max-settext-per-second", type=float)
+    parser.add_argument("--input-changes-per-second", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    budget = CostBudget(
+        max_chars=args.max_chars,
+        max_first_tick_ops=args.max_first_tick_ops,
+        max_tick_ops=args.max_tick_ops,
+        max_objects=args.max_objects,
+        max_settext_per_second=args.max_settext_per_second,
+    )
+    failed = False
+    for path in args.paths:
+        if path.endswith(config.PROJECT_EXTENSION):
+            code = HudExporter().export_to_string(load_project(path))
+        else:
+            with open(path, "r", encoding="utf-8") as file:
+                code = file.read()
+        report = estimate_cost(code, args.input_changes_per_second)
+        problems = check_budget(report, budget)
+        print(f"{path}\n{format_report(report)}")
+        for problem in problems:
+            print(f"  OVER BUDGET: {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,655 @@
+# Pre-emission passes that rewrite the export draw list.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+import math
+
+from model import Point, Shape
+
+# (layer colour override, shape) in draw order; every item becomes one EGP object.
+DrawItem = Tuple[Optional[str], Shape]
+Bounds = Tuple[float, float, float, float]
+
+# Coordinates closer than this (in project pixels) are treated as equal.
+MERGE_EPSILON = 0.05
+
+FILLED_KINDS = ("box", "circle", "circle_filled", "poly")
+
+# Grid cell size (project pixels) used to index occluders.
+OCCLUSION_CELL = 64
+
+
+# Twice the triangle area below which a corner is treated as collinear when splitting polys.
+_AREA_EPSILON = 1e-6
+
+
+# Reasons a shape can never be seen, in the order they are checked.
+DEAD_REASONS = ("too_few_points", "transparent", "zero_size", "degenerate_line", "empty_text", "off_screen")
+
+
+@dataclass
+class DeadShapeReport:
+    removed: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        """Description: Number of dead shapes
+        Inputs: None
+        """
+        return sum(len(ids) for ids in self.removed.values())
+
+    def counts(self) -> Dict[str, int]:
+        """Description: Dead shape count per reason
+        Inputs: None
+        """
+        return {reason: len(ids) for reason, ids in self.removed.items()}
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {"total": self.total, "removed": {reason: list(ids) for reason, ids in self.removed.items()}}
+
+
+@dataclass
+class SimplifyReport:
+    shapes_simplified: int = 0
+    vertices_before: int = 0
+    vertices_removed: int = 0
+    # Largest distance (project pixels) from a dropped vertex to the simplified outline.
+    max_deviation: float = 0.0
+
+    def add(self, before: int, after: int, deviation: float) -> None:
+        """Description: Accumulate the result of simplifying one poly
+        Inputs: before: int, after: int, deviation: float
+        """
+        self.vertices_before += before
+        if after < before:
+            self.shapes_simplified += 1
+            self.vertices_removed += before - after
+            self.max_deviation = max(self.max_deviation, deviation)
+
+
+@dataclass
+class PackReport:
+    objects_before: int = 0
+    objects_after: int = 0
+    merged_boxes: int = 0
+    collapsed_rects: int = 0
+
+
+def emitted_color(layer_color: Optional[str], shape: Shape) -> str:
+    """Description: Colour the exporter will emit for a shape, normalised to upper-case hex
+    Inputs: layer_color: Optional[str], shape: Shape
+    """
+    if shape.kind in FILLED_KINDS:
+        color = layer_color or shape.fill or shape.stroke
+    else:
+        color = layer_color or shape.stroke
+    return (color or "").upper()
+
+
+def alpha_of(shape: Shape) -> int:
+    """Description: Clamped alpha
+    Inputs: shape: Shape
+    """
+    return max(0, min(255, int(getattr(shape, "alpha", 255))))
+
+
+def shape_bounds(shape: Shape) -> Optional[Bounds]:
+    """Description: Conservative (min_x, min_y, max_x, max_y) of what a shape draws
+    Inputs: shape: Shape
+    """
+    if not shape.points:
+        return None
+    if shape.kind == "text":
+        # EGP text extent is not known at export time; approximate from font size and length.
+        x, y = shape.points[0]
+        width = max(1, len(shape.text)) * shape.font_size * 0.6
+        height = shape.font_size
+        if shape.align == "center":
+            left = x - width / 2
+        elif shape.align == "right":
+            left = x - width
+        else:
+            left = x
+        return (left, y - height / 2, left + width, y + height / 2)
+    xs = [p[0] for p in shape.points]
+    ys = [p[1] for p in shape.points]
+    pad = max(1, int(shape.stroke_width)) / 2 if shape.kind == "line" else 0.0
+    return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+
+def bounds_intersect(a: Bounds, b: Bounds) -> bool:
+    """Description: Whether two bounds overlap by more than MERGE_EPSILON
+    Inputs: a: Bounds, b: Bounds
+    """
+    return (
+        a[0] < b[2] - MERGE_EPSILON
+        and b[0] < a[2] - MERGE_EPSILON
+        and a[1] < b[3] - MERGE_EPSILON
+        and b[1] < a[3] - MERGE_EPSILON
+    )
+
+
+def axis_line_box(shape: Shape) -> Optional[Bounds]:
+    """Description: Box bounds the exporter emits for an axis-aligned line, or None for diagonal lines
+    Inputs: shape: Shape
+    """
+    if shape.kind != "line" or len(shape.points) < 2:
+        return None
+    (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
+    stroke = max(1, int(shape.stroke_width))
+    cx = (x1 + x2) / 2
+    cy = (y1 + y2) / 2
+    if round(abs(y2 - y1), 0) == 0:
+        width, height = max(abs(x2 - x1), 1), stroke
+    elif round(abs(x2 - x1), 0) == 0:
+        width, height = stroke, max(abs(y2 - y1), 1)
+    else:
+        return None
+    return (cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2)
+
+
+def dead_reason(shape: Shape, resolution: Tuple[int, int]) -> Optional[str]:
+    """Description: Why a shape can never be seen, or None if it may be visible
+    Inputs: shape: Shape, resolution: Tuple[int, int]
+    """
+    min_points = 3 if shape.kind == "poly" else 1 if shape.kind == "text" else 2
+    if len(shape.points) < min_points:
+        return "too_few_points"
+    if alpha_of(shape) == 0:
+        return "transparent"
+    if shape.kind in ("rect", "box", "circle", "circle_filled"):
+        (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
+        if abs(x2 - x1) <= MERGE_EPSILON or abs(y2 - y1) <= MERGE_EPSILON:
+            return "zero_size"
+    if shape.kind == "line":
+        (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
+        if abs(x2 - x1) <= MERGE_EPSILON and abs(y2 - y1) <= MERGE_EPSILON:
+            return "degenerate_line"
+    if shape.kind == "text" and not shape.text:
+        return "empty_text"
+    bounds = shape_bounds(shape)
+    if bounds is not None:
+        if shape.kind == "text":
+            # Pad by the estimated width again so a long string near an edge is never dropped.
+            pad = bounds[2] - bounds[0]
+            bounds = (bounds[0] - pad, bounds[1] - pad, bounds[2] + pad, bounds[3] + pad)
+        if bounds[2] < 0 or bounds[3] < 0 or bounds[0] > resolution[0] or bounds[1] > resolution[1]:
+            return "off_screen"
+    return None
+
+
+def eliminate_dead(items: List[DrawItem], resolution: Tuple[int, int]) -> Tuple[List[DrawItem], DeadShapeReport]:
+    """Description: Drop shapes that can never be seen and report them by reason
+    Inputs: items: List[DrawItem], resolution: Tuple[int, int]
+    """
+    report = DeadShapeReport()
+    kept: List[DrawItem] = []
+    for item in items:
+        reason = dead_reason(item[1], resolution)
+        if reason is None:
+            kept.append(item)
+        else:
+            report.removed.setdefault(reason, []).append(item[1].id)
+    return kept, report
+
+
+def simplify_polygon(points: List[Point], tolerance: float) -> Tuple[List[Point], float]:
+    """Description: Douglas-Peucker simplification of a closed polygon; returns kept points and max deviation in pixels
+    Inputs: points: List[Point], tolerance: float
+    """
+    count = len(points)
+    if tolerance <= 0 or count <= 3:
+        return list(points), 0.0
+    # Split the ring at the first vertex and the vertex farthest from it, then simplify both chains.
+    far = max(range(1, count), key=lambda index: math.dist(points[0], points[index]))
+    keep = [False] * count
+    keep[0] = keep[far] = True
+    deviation = 0.0
+    stack = [(0, far), (far, count)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end % count]
+        split, worst = start, -1.0
+        for index in range(start + 1, end):
+            distance = _segment_distance(points[index], a, b)
+            if distance > worst:
+                split, worst = index, distance
+        if worst > tolerance:
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+        else:
+            deviation = max(deviation, worst)
+    kept = [point for point, flag in zip(points, keep) if flag]
+    if len(kept) < 3:
+        # Never collapse a poly below a triangle; keep the vertex that deviates most from the chord.
+        index = max(
+            (index for index in range(count) if not keep[index]),
+            key=lambda index: _segment_distance(points[index], points[0], points[far]),
+        )
+        keep[index] = True
+        kept = [point for point, flag in zip(points, keep) if flag]
+        deviation = max(
+            (_ring_distance(point, kept) for point, flag in zip(points, keep) if not flag),
+            default=0.0,
+        )
+    return kept, deviation
+
+
+def simplify_polys(items: List[DrawItem], tolerance: float) -> Tuple[List[DrawItem], SimplifyReport]:
+    """Description: Replace poly shapes with simplified copies; the source shapes are left untouched
+    Inputs: items: List[DrawItem], tolerance: float
+    """
+    report = SimplifyReport()
+    simplified: List[DrawItem] = []
+    for layer_color, shape in items:
+        if shape.kind == "poly" and len(shape.points) > 3:
+            points, deviation = simplify_polygon(shape.points, tolerance)
+            report.add(len(shape.points), len(points), deviation)
+            if len(points) < len(shape.points):
+                shape = replace(shape, points=points)
+        simplified.append((layer_color, shape))
+    return simplified, report
+
+
+def split_polys(items: List[DrawItem], max_vertices: int) -> Tuple[List[DrawItem], int]:
+    """Description: Replace concave polys and polys over max_vertices with convex pieces; returns items and polys split
+    Inputs: items: List[DrawItem], max_vertices: int
+    """
+    split: List[DrawItem] = []
+    count = 0
+    for layer_color, shape in items:
+        if shape.kind != "poly" or len(shape.points) < 3:
+            split.append((layer_color, shape))
+            continue
+        pieces = convex_pieces(shape.points, max_vertices)
+        if len(pieces) == 1 and len(pieces[0]) == len(shape.points):
+            split.append((layer_color, shape))
+            continue
+        count += 1
+        # Pieces take consecutive draw slots, so the extra egp ids follow the original one in a stable order.
+        for index, points in enumerate(pieces):
+            piece_id = shape.id if index == 0 else f"{shape.id}:{index}"
+            split.append((layer_color, replace(shape, id=piece_id, points=points)))
+    return split, count
+
+
+def convex_pieces(points: List[Point], max_vertices: int) -> List[List[Point]]:
+    """Description: Decompose a simple polygon into convex pieces of at most max_vertices (ear clipping, then Hertel-Mehlhorn merging)
+    Inputs: points: List[Point], max_vertices: int
+    """
+    max_vertices = max(3, max_vertices)
+    ring = list(points)
+    # Pieces are wound with positive signed area, which is clockwise on screen (y down) as EGP polys expect.
+    if _signed_area(ring) < 0:
+        ring.reverse()
+    if len(ring) <= max_vertices and _is_convex(ring):
+        return [list(points)]
+    pieces: List[Optional[List[int]]] = [list(triangle) for triangle in _ear_clip(ring)]
+    # Each directed edge belongs to one piece; a diagonal shared by two pieces appears once in each direction.
+    owner: Dict[Tuple[int, int], int] = {}
+    for index, piece in enumerate(pieces):
+        for position in range(len(piece)):
+            owner[(piece[position - 1], piece[position])] = index
+    merged = True
+    while merged:
+        merged = False
+        for a, b in list(owner):
+            index, other = owner.get((a, b)), owner.get((b, a))
+            if index is None or other is None or index == other:
+                continue
+            if len(pieces[index]) + len(pieces[other]) - 2 > max_vertices:
+                continue
+            union = _join_pieces(pieces[index], pieces[other], a, b)
+            if not _is_convex([ring[vertex] for vertex in union]):
+                continue
+            pieces[index], pieces[other] = union, None
+            del owner[(a, b)], owner[(b, a)]
+            for position in range(len(union)):
+                owner[(union[position - 1], union[position])] = index
+            merged = True
+    return [[ring[vertex] for vertex in piece] for piece in pieces if piece is not None]
+
+
+def _ear_clip(ring: List[Point]) -> List[Tuple[int, int, int]]:
+    """Description: Triangulate a counter-clockwise simple polygon into vertex index triples
+    Inputs: ring: List[Point]
+    """
+    remaining = list(range(len(ring)))
+    triangles: List[Tuple[int, int, int]] = []
+    while len(remaining) > 3:
+        size = len(remaining)
+        ear = None
+        for position in range(size):
+            prev, vertex, nxt = remaining[position - 1], remaining[position], remaining[(position + 1) % size]
+            if _cross(ring[prev], ring[vertex], ring[nxt]) <= _AREA_EPSILON:
+                continue
+            if any(
+                _in_triangle(ring[other], ring[prev], ring[vertex], ring[nxt])
+                for other in remaining
+                if other not in (prev, vertex, nxt)
+            ):
+                continue
+            ear = position
+            break
+        if ear is None:
+            # Collinear runs or self-intersections leave no clean ear; clip the flattest corner to make progress.
+            ear = min(
+                range(size),
+                key=lambda position: abs(_cross(ring[remaining[position - 1]], ring[remaining[position]], ring[remaining[(position + 1) % size]])),
+            )
+        prev, vertex, nxt = remaining[ear - 1], remaining[ear], remaining[(ear + 1) % size]
+        if abs(_cross(ring[prev], ring[vertex], ring[nxt])) > _AREA_EPSILON:
+            triangles.append((prev, vertex, nxt))
+        del remaining[ear]
+    if abs(_cross(*(ring[vertex] for vertex in remaining))) > _AREA_EPSILON:
+        triangles.append(tuple(remaining))
+    return triangles
+
+
+def _join_pieces(first: List[int], second: List[int], a: int, b: int) -> List[int]:
+    """Description: Union of two pieces sharing the diagonal a->b (in first) / b->a (in second)
+    Inputs: first: List[int], second: List[int], a: int, b: int
+    """
+    start = first.index(b)
+    head = first[start:] + first[:start]
+    start = second.index(a)
+    tail = second[start:] + second[:start]
+    return head + tail[1:-1]
+
+
+def _cross(a: Point, b: Point, c: Point) -> float:
+    """Description: Z of (b - a) x (c - b); positive for a left turn
+    Inputs: a: Point, b: Point, c: Point
+    """
+    return (b[0] - a[0]) * (c[1] - b[1]) - (b[1] - a[1]) * (c[0] - b[0])
+
+
+def _signed_area(ring: List[Point]) -> float:
+    """Description: Twice the signed area of a ring
+    Inputs: ring: List[Point]
+    """
+    return sum(ring[index - 1][0] * ring[index][1] - ring[index][0] * ring[index - 1][1] for index in range(len(ring)))
+
+
+def _is_convex(ring: List[Point]) -> bool:
+    """Description: Whether a counter-clockwise ring has no right turns
+    Inputs: ring: List[Point]
+    """
+    size = len(ring)
+    return all(_cross(ring[index - 2], ring[index - 1], ring[index]) >= -_AREA_EPSILON for index in range(size))
+
+
+def _in_triangle(point: Point, a: Point, b: Point, c: Point) -> bool:
+    """Description: Whether a point lies inside or on a counter-clockwise triangle
+    Inputs: point: Point, a: Point, b: Point, c: Point
+    """
+    return _cross(a, b, point) >= 0 and _cross(b, c, point) >= 0 and _cross(c, a, point) >= 0
+
+
+def _segment_distance(point: Point, a: Point, b: Point) -> float:
+    """Description: Distance from a point to the segment a-b
+    Inputs: point: Point, a: Point, b: Point
+    """
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.dist(point, a)
+    t = max(0.0, min(1.0, ((point[0] - a[0]) * dx + (point[1] - a[1]) * dy) / length_sq))
+    return math.dist(point, (a[0] + t * dx, a[1] + t * dy))
+
+
+def _ring_distance(point: Point, ring: List[Point]) -> float:
+    """Description: Distance from a point to the nearest edge of a closed ring
+    Inputs: point: Point, ring: List[Point]
+    """
+    return min(_segment_distance(point, ring[index - 1], ring[index]) for index in range(len(ring)))
+
+
+def pack_objects(items: List[DrawItem]) -> Tuple[List[DrawItem], PackReport]:
+    """Description: Merge same-colour touching boxes/axis lines and collapse 1px line rectangles to cut the object count
+    Inputs: items: List[DrawItem]
+    """
+    report = PackReport(objects_before=len(items))
+    slots: List[Optional[DrawItem]] = list(items)
+    bounds = [shape_bounds(shape) for _color, shape in items]
+    report.collapsed_rects = _collapse_line_rects(slots, bounds)
+
+    boxes: Dict[int, Bounds] = {}
+    for index, item in enumerate(slots):
+        if item is None:
+            continue
+        shape = item[1]
+        if shape.kind == "box" and len(shape.points) >= 2:
+            (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
+            boxes[index] = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        else:
+            line_box = axis_line_box(shape)
+            if line_box is not None:
+                boxes[index] = line_box
+
+    merged = True
+    while merged:
+        merged = False
+        for horizontal in (True, False):
+            count = _merge_box_runs(slots, bounds, boxes, horizontal)
+            report.merged_boxes += count
+            merged = merged or count > 0
+
+    packed = [item for item in slots if item is not None]
+    report.objects_after = len(packed)
+    return packed, report
+
+
+def _key(value: float) -> int:
+    """Description: Bucket a coordinate so values within MERGE_EPSILON usually share a key
+    Inputs: value: float
+    """
+    return round(value / MERGE_EPSILON)
+
+
+def _clear_between(slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], members: List[int], area: Bounds) -> bool:
+    """Description: Whether no other shape drawn between the members overlaps the merged area
+    Inputs: slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], members: List[int], area: Bounds
+    """
+    member_set = set(members)
+    for index in range(min(members) + 1, max(members)):
+        if index in member_set or slots[index] is None:
+            continue
+        other = bounds[index]
+        if other is not None and bounds_intersect(other, area):
+            return False
+    return True
+
+
+def _replace(slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], members: List[int], item: DrawItem, area: Bounds) -> int:
+    """Description: Put the merged item at the first member's draw position and drop the rest
+    Inputs: slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], members: List[int], item: DrawItem, area: Bounds
+    """
+    first = min(members)
+    for index in members:
+        slots[index] = None
+        bounds[index] = None
+    slots[first] = item
+    bounds[first] = area
+    return first
+
+
+def _merge_box_runs(slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], boxes: Dict[int, Bounds], horizontal: bool) -> int:
+    """Description: Merge boxes that share a full edge along one axis; returns the number of merges
+    Inputs: slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]], boxes: Dict[int, Bounds], horizontal: bool
+    """
+    # Along x the shared edge is the y-span and vice versa.
+    lo, hi, span_lo, span_hi = (0, 2, 1, 3) if horizontal else (1, 3, 0, 2)
+    groups: Dict[tuple, List[int]] = {}
+    for index, box in boxes.items():
+        layer_color, shape = slots[index]
+        key = (emitted_color(layer_color, shape), alpha_of(shape), _key(box[span_lo]), _key(box[span_hi]))
+        groups.setdefault(key, []).append(index)
+
+    merges = 0
+    for (_color, alpha, _a, _b), members in groups.items():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda index: boxes[index][lo])
+        current = members[0]
+        for index in members[1:]:
+            cur_box = boxes[current]
+            box = boxes[index]
+            touching = box[lo] <= cur_box[hi] + MERGE_EPSILON
+            # Translucent overlaps blend twice, so only opaque boxes may overlap when merged.
+            overlapping = box[lo] < cur_box[hi] - MERGE_EPSILON
+            if not touching or (overlapping and alpha < 255):
+                current = index
+                continue
+            area = (
+                min(cur_box[0], box[0]),
+                min(cur_box[1], box[1]),
+                max(cur_box[2], box[2]),
+                max(cur_box[3], box[3]),
+            )
+            pair = [current, index]
+            if not _clear_between(slots, bounds, pair, area):
+                current = index
+                continue
+            layer_color, shape = slots[min(pair)]
+            color = emitted_color(layer_color, shape)
+            merged_shape = Shape(
+                id=shape.id,
+                kind="box",
+                points=[(area[0], area[1]), (area[2], area[3])],
+                stroke=color,
+                stroke_width=1,
+                alpha=alpha,
+                fill=color,
+            )
+            first = _replace(slots, bounds, pair, (layer_color, merged_shape), area)
+            del boxes[current]
+            del boxes[index]
+            boxes[first] = area
+            current = first
+            merges += 1
+    return merges
+
+
+def _collapse_line_rects(slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]]) -> int:
+    """Description: Replace four 1px axis lines that outline a rectangle with a single rect; returns the count
+    Inputs: slots: List[Optional[DrawItem]], bounds: List[Optional[Bounds]]
+    """
+    horizontals: Dict[tuple, List[Tuple[int, float]]] = {}
+    verticals: Dict[tuple, int] = {}
+    for index, item in enumerate(slots):
+        if item is None:
+            continue
+        layer_color, shape = item
+        if shape.kind != "line" or len(shape.points) < 2 or int(shape.stroke_width) != 1:
+            continue
+        (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
+        style = (emitted_color(layer_color, shape), alpha_of(shape))
+        if abs(y2 - y1) <= MERGE_EPSILON and abs(x2 - x1) > MERGE_EPSILON:
+            key = style + (_key(min(x1, x2)), _key(max(x1, x2)))
+            horizontals.setdefault(key, []).append((index, (y1 + y2) / 2))
+        elif abs(x2 - x1) <= MERGE_EPSILON and abs(y2 - y1) > MERGE_EPSILON:
+            key = style + (_key((x1 + x2) / 2), _key(min(y1, y2)), _key(max(y1, y2)))
+            verticals.setdefault(key, index)
+
+    collapsed = 0
+    for key, lines in horizontals.items():
+        color, alpha, left_key, right_key = key
+        lines.sort(key=lambda entry: entry[1])
+        used: set[int] = set()
+        for top_index, top in lines:
+            for bottom_index, bottom in lines:
+                if top_index in used or bottom_index in used or bottom - top <= MERGE_EPSILON:
+                    continue
+                left = verticals.get((color, alpha, left_key, _key(top), _key(bottom)))
+                right = verticals.get((color, alpha, right_key, _key(top), _key(bottom)))
+                if left is None or right is None or slots[left] is None or slots[right] is None:
+                    continue
+                members = [top_index, bottom_index, left, right]
+                layer_color, shape = slots[min(members)]
+                (x1, _), (x2, _) = slots[top_index][1].points[0], slots[top_index][1].points[1]
+                area = (min(x1, x2), top, max(x1, x2), bottom)
+                if not _clear_between(slots, bounds, members, area):
+                    continue
+                rect = Shape(
+                    id=shape.id,
+                    kind="rect",
+                    points=[(area[0], area[1]), (area[2], area[3])],
+                    stroke=color,
+                    stroke_width=1,
+                    alpha=alpha,
+                )
+                _replace(slots, bounds, members, (layer_color, rect), area)
+                used.update((top_index, bottom_index))
+                collapsed += 1
+    return collapsed
+
+
+def cull_occluded(items: List[DrawItem]) -> Tuple[List[DrawItem], List[str]]:
+    """Description: Drop shapes fully covered by an opaque box or filled circle drawn later; returns kept items and culled ids
+    Inputs: items: List[DrawItem]
+    """
+    # Occluders drawn later are indexed by grid cell; a cover that contains a shape must touch the cell of its centre.
+    cells: Dict[Tuple[int, int], List[Tuple[str, Bounds]]] = {}
+    kept: List[DrawItem] = []
+    culled: List[str] = []
+    for item in reversed(items):
+        shape = item[1]
+        bounds = axis_line_box(shape) or shape_bounds(shape)
+        # Text extent depends on the in-game font and, for dynamic text, on runtime values; never cull it.
+        if bounds is not None and shape.kind != "text":
+            cell = _cell((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2)
+            if any(_covers(kind, cover, bounds) for kind, cover in cells.get(cell, ())):
+                culled.append(shape.id)
+                continue
+        kept.append(item)
+        if shape.kind in ("box", "circle_filled") and alpha_of(shape) == 255 and bounds is not None:
+            for key in _cells_overlapping(bounds):
+                cells.setdefault(key, []).append((shape.kind, bounds))
+    kept.reverse()
+    culled.reverse()
+    return kept, culled
+
+
+def _cell(x: float, y: float) -> Tuple[int, int]:
+    """Description: Grid cell containing a point
+    Inputs: x: float, y: float
+    """
+    return (math.floor(x / OCCLUSION_CELL), math.floor(y / OCCLUSION_CELL))
+
+
+def _cells_overlapping(bounds: Bounds) -> List[Tuple[int, int]]:
+    """Description: Grid cells touched by bounds
+    Inputs: bounds: Bounds
+    """
+    x0, y0 = _cell(bounds[0], bounds[1])
+    x1, y1 = _cell(bounds[2], bounds[3])
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _covers(kind: str, cover: Bounds, bounds: Bounds) -> bool:
+    """Description: Whether an opaque box/ellipse with the given bounds fully contains bounds
+    Inputs: kind: str, cover: Bounds, bounds: Bounds
+    """
+    if kind == "box":
+        return cover[0] <= bounds[0] and cover[1] <= bounds[1] and bounds[2] <= cover[2] and bounds[3] <= cover[3]
+    rx = (cover[2] - cover[0]) / 2
+    ry = (cover[3] - cover[1]) / 2
+    if rx <= 0 or ry <= 0:
+        return False
+    cx = cover[0] + rx
+    cy = cover[1] + ry
+    # An ellipse is convex, so containing all four corners means containing the whole box.
+    for x in (bounds[0], bounds[2]):
+        for y in (bounds[1], bounds[3]):
+            if ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 > 1:
+                return False
+    return True
@@ -2,47 +2,776 @@
 
 from __future__ import annotations
 
-from typing import Dict, Iterable, Tuple
+from collections import OrderedDict
+from dataclasses import astuple, dataclass, field
+from hashlib import sha1
+from itertools import count
+from math import floor, gcd, hypot
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, TextIO, Tuple
+import os
 import re
 
-from model import Project, Shape
+from cost_model import ASSIGN_WEIGHT, estimate_ops
+from export_passes import (
+    DeadShapeReport,
+    DrawItem,
+    axis_line_box,
+    cull_occluded,
+    eliminate_dead,
+    pack_objects,
+    shape_bounds,
+    simplify_polys,
+    split_polys,
+)
+from manifest import ExportManifest, ManifestEntry, PatchPlan, plan_patch
+from minifier import Minifier, MinifyReport, trim_number
+from model import Layer, PrecisionPolicy, Project, Shape
+
+# Placeholder rendered in place of the egp id so cached snippets can be re-numbered.
+_ID_SLOT = "\x00"
+
+_TOKEN_RE = re.compile(r"%([A-Za-z0-9_]+)%(R(\d))?")
+_CALL_RE = re.compile(r"[A-Za-z_]\w*\(")
+_BINOP_RE = re.compile(r" [-+*/] ")
+
+# EGP object defaults: white, opaque, WireGUI font at size 18.
+_DEFAULT_RGB = (255, 255, 255)
+_DEFAULT_ALPHA = 255
+_DEFAULT_FONT_SIZE = 18
+
+# E2 refuses timers shorter than 10ms.
+_MIN_INTERVAL = 10
+_DEFAULT_RATE = 100
+
+# Variables the generated header already persists; hoisted names must avoid them.
+_RESERVED_NAMES = {
+    "EGP", "X", "Y", "Res", "ProjRes", "Scale", "Tick", "Init",
+    "LastScr", "ResizeAt", "LayoutId", "LayoutKind", "LayoutAt", "LayoutVec", "Pk",
+}
+# Locals of the resize block and packedObjects(); renamed when an input has the same name.
+_LOCAL_NAMES = ("Scr", "Last", "I", "J", "K", "A", "B", "Id", "Row", "Count", "Kind", "At", "Org", "Verts")
+_LOCAL_RE = re.compile(r"\b(" + "|".join(_LOCAL_NAMES) + r")\b")
+
+# Layout table kinds re-applied after a screen resize; negative codes are relative to a parent anchor.
+_LAYOUT_POS = 1
+_LAYOUT_POS_SIZE = 2
+_LAYOUT_VERTICES = 3
+# Values per array() literal when writing persisted tables.
+_LAYOUT_CHUNK = 64
+
+# Table-driven emission: each packed object is one row of kind, two vectors (offset + size, or two line
+# offsets) and an RGBA colour in the persisted Pk array, created by the packedObjects() interpreter.
+_PACK_STRIDE = 9
+_PACK_CALLS = {
+    1: "EGP:egpBox(Id + I, Res + A, B)",
+    2: "EGP:egpBoxOutline(Id + I, Res + A, B)",
+    3: "EGP:egpCircle(Id + I, Res + A, B)",
+    4: "EGP:egpCircleOutline(Id + I, Res + A, B)",
+    5: "EGP:egpLine(Id + I, Res + A, Res + B)",
+}
+# Allocator keys for split pieces ("id:2") and repeated shape ids ("id#1") belong to the base shape.
+_ALLOC_KEY_RE = re.compile(r"^(.*?)(?::\d+)?(?:#\d+)?$")
+# Screen size poll (ms); the watcher runs on its own named timer so it never disturbs interval()/clk().
+_RESIZE_POLL = 500
+
+
+@dataclass
+class ExportOptions:
+    optimize_vectors: bool = False
+    fuse_calls: bool = True
+    # "interval" re-sends every dynamic text on a timer; "changed" only re-sends text whose inputs triggered the run.
+    dynamic_updates: str = "interval"
+    # Staged initialisation: spread object creation over ticks when either limit is set (0 = unlimited).
+    init_objects_per_tick: int = 0
+    init_ops_per_tick: int = 0
+    pack_objects: bool = False
+    cull_occluded: bool = False
+    drop_dead_shapes: bool = False
+    # Douglas-Peucker tolerance in project pixels for poly vertices (0 = keep every vertex).
+    simplify_tolerance: float = 0.0
+    # Split concave polys and polys with more vertices than this into convex pieces (0 = emit polys as drawn).
+    max_poly_vertices: int = 0
+    # Emit one invisible anchor per layer (allocated before the shapes) and egpParent each shape to it with anchor-relative positions.
+    parent_layers: bool = False
+    # Keep a persisted layout table and re-apply positions/sizes in batches when egpScrSize changes.
+    watch_resolution: bool = False
+    resize_batch: int = 32
+    # Pack boxes, outlines, circles and lines into a persisted array created by one loop, per call kind when smaller.
+    table_emission: bool = False
+    # Strip whitespace, trim numbers, shorten persisted names and fold Scale into vec2 literals.
+    minify: bool = False
+    # Take egp ids from the project's persistent allocator instead of numbering the draw list.
+    stable_ids: bool = False
+
+
+@dataclass
+class ExportReport:
+    chars_saved: int = 0
+    ops_saved: int = 0
+    hoisted: int = 0
+    calls_removed: int = 0
+    init_stages: int = 1
+    max_stage_ops: int = 0
+    objects_before: int = 0
+    objects_after: int = 0
+    merged_boxes: int = 0
+    collapsed_rects: int = 0
+    culled_ids: list[str] = field(default_factory=list)
+    dead_shapes: DeadShapeReport = field(default_factory=DeadShapeReport)
+    vertices_removed: int = 0
+    max_deviation: float = 0.0
+    polys_split: int = 0
+    table_objects: int = 0
+    table_chars_saved: int = 0
+    minified: MinifyReport = field(default_factory=MinifyReport)
+    # Largest distance (project pixels) between a shape's geometry and the emitted literals under the precision policy.
+    max_position_error: float = 0.0
+    max_size_error: float = 0.0
+    # Patch export: objects removed, (re)created, re-created because their shape changed, and left alone.
+    patch_removed: int = 0
+    patch_created: int = 0
+    patch_updated: int = 0
+    patch_unchanged: int = 0
+
+
+class _Snippet(NamedTuple):
+    parts: Tuple[str, ...]
+    text_expr: str
+    is_dynamic: bool
+    inputs: Tuple[str, ...] = ()
+    rate: int = _DEFAULT_RATE
+    vectors: Tuple[str, ...] = ()
+    # Weighted op estimate of the object's code; only computed when staged initialisation is on.
+    ops: int = 0
+    chars_saved: int = 0
+    ops_saved: int = 0
+    calls_removed: int = 0
+    # (layout kind, project-pixel vectors) re-applied on resize; empty when not watching the resolution.
+    layout: Tuple[int, Tuple[str, ...]] | Tuple[()] = ()
+    # Packed table row (call kind first) when table emission can create this object; empty otherwise.
+    row: Tuple[str, ...] = ()
+    position_error: float = 0.0
+    size_error: float = 0.0
+
+
+def expr_ops(expr: str) -> int:
+    """Description: Cheap op count (calls plus binary operators) for per-shape savings; cost_model has the weighted estimate
+    Inputs: expr: str
+    """
+    return len(_CALL_RE.findall(expr)) + len(_BINOP_RE.findall(expr))
+
+
+class SnippetCache:
+    def __init__(self, max_entries: int = 8192) -> None:
+        """Description: Bounded LRU cache of rendered shape snippets keyed by shape content
+        Inputs: max_entries: int = 8192
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, _Snippet]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Description: Len
+        Inputs: None
+        """
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[_Snippet]:
+        """Description: Get a snippet and mark it as most recently used
+        Inputs: key: tuple
+        """
+        snippet = self._entries.get(key)
+        if snippet is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return snippet
+
+    def put(self, key: tuple, snippet: _Snippet) -> None:
+        """Description: Store a snippet, evicting the least recently used entries
+        Inputs: key: tuple, snippet: _Snippet
+        """
+        self._entries[key] = snippet
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Description: Clear
+        Inputs: None
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class HudExporter:
-    def __init__(self, path: str) -> None:
-        """Description: Init
-        Inputs: path: str
+    def __init__(
+        self,
+        path: str | None = None,
+        cache: SnippetCache | None = None,
+        options: ExportOptions | None = None,
+        manifest: ExportManifest | None = None,
+    ) -> None:
+        """Description: Init; a manifest from an earlier export keeps each shape on the egp id it had there
+        Inputs: path: str | None = None, cache: SnippetCache | None = None, options: ExportOptions | None = None, manifest: ExportManifest | None = None
         """
         self.path = path
+        self.cache = cache
+        self.options = options or ExportOptions()
+        self.base_manifest = manifest
+        # What the last export put on the screen.
+        self.manifest = ExportManifest()
+        self.report = ExportReport()
         self._header_lines: list[str] = []
+        self._render_vectors: list[str] = []
+        self._render_savings = [0, 0, 0]
+        self._render_origin: Tuple[float, float] | None = None
+        self._render_errors = [0.0, 0.0]
+        self._precision = PrecisionPolicy()
+        self._locals: Dict[str, str] = {}
+        self._patch_base: ExportManifest | None = None
+        self._shape_ids: Dict[int, str] = {}
+        self._parents: Dict[int, int] = {}
 
     def export(self, project: Project) -> None:
-        """Description: Export
+        """Description: Export to the configured path; the script streams into a temp file that replaces the target only on success
         Inputs: project: Project
         """
-        self._header_lines = self._build_header(project)
-        with open(self.path, "w", encoding="utf-8") as file:
-            file.writelines(self._header_lines)
+        if self.path is None:
+            raise ValueError("HudExporter.export requires an output path")
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                self.export_to(project, file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
 
-        egp_id = 0
+    def export_to(self, project: Project, sink: TextIO) -> None:
+        """Description: Stream the script into any writable text sink (file, StringIO, socket wrapper) without holding it in memory
+        Inputs: project: Project, sink: TextIO
+        """
+        sink.writelines(self.iter_export(project))
+
+    def export_to_string(self, project: Project) -> str:
+        """Description: Export and return the E2 code without touching the filesystem
+        Inputs: project: Project
+        """
+        return "".join(self.iter_export(project))
+
+    def iter_export(self, project: Project) -> Iterator[str]:
+        """Description: Lazily yield the script as header, per-shape, footer and dynamic-block chunks
+        Inputs: project: Project
+        """
+        chunks = self._iter_pretty(project)
+        if not self.options.minify:
+            yield from chunks
+            return
+        minifier = Minifier(input_def.name for input_def in project.inputs)
+        for chunk in chunks:
+            yield minifier.minify(chunk)
+        self.report.minified = minifier.report
+
+    def export_patch_to_string(self, project: Project, previous: ExportManifest) -> str:
+        """Description: Patch script that turns the screen left by the previous export into this project
+        Inputs: project: Project, previous: ExportManifest
+        """
+        return "".join(self.iter_patch(project, previous))
+
+    def iter_patch(self, project: Project, previous: ExportManifest) -> Iterator[str]:
+        """Description: Like iter_export, but egpRemove only stale objects and create only new or changed ones
+        Inputs: project: Project, previous: ExportManifest
+        """
+        self._patch_base = previous
+        try:
+            yield from self.iter_export(project)
+        finally:
+            self._patch_base = None
+
+    def _iter_pretty(self, project: Project) -> Iterator[str]:
+        """Description: Yield the readable script chunks
+        Inputs: project: Project
+        """
+        self.report = ExportReport()
+        self._precision = project.precision
+        self._locals = self._local_names(project)
+        snippets: Iterable[Tuple[int, _Snippet]] = self._iter_snippets(project)
+        hoisted: Dict[str, str] = {}
+        packed_kinds: set[str] = set()
+        packed_rows: list[str] = []
+        packed_chars = 0
+        manifest = ExportManifest()
+        patch: PatchPlan | None = None
+        if self._patch_base is not None or self.options.optimize_vectors or self.options.table_emission:
+            # Removals, hoisting and the packed table must be in the header, so these modes buffer snippets.
+            snippets = list(snippets)
+            if self._patch_base is not None:
+                for egp_id, snippet in snippets:
+                    self._record(manifest, egp_id, snippet)
+                patch = self._plan_patch(manifest)
+            if self.options.table_emission and patch is None:
+                packed_kinds = self._table_kinds(snippets)
+                for egp_id, snippet in snippets:
+                    if snippet.row[:1] and snippet.row[0] in packed_kinds:
+                        packed_rows.extend(snippet.row)
+                        packed_chars += len(str(egp_id).join(snippet.parts))
+            if self.options.optimize_vectors:
+                unrolled = [
+                    (egp_id, snippet)
+                    for egp_id, snippet in snippets
+                    if (not snippet.row[:1] or snippet.row[0] not in packed_kinds)
+                    and (patch is None or egp_id in patch.created)
+                ]
+                hoisted = self._hoist_table(project, unrolled)
+
+        self._header_lines = self._build_header(project, hoisted, packed_rows, packed_kinds, patch.removed if patch else None)
+        if packed_rows:
+            table_lines = ["\n", " Pk:array", *self._packed_function(packed_kinds), *self._array_lines("Pk", packed_rows)]
+            self.report.table_chars_saved = packed_chars - len("".join(table_lines))
+        yield "".join(self._header_lines)
+        packed_ops = estimate_ops("".join(self._packed_loop(packed_kinds))) if packed_kinds else 0
+        run: list[int] = []
+        row_index = 1
+
+        staged = self._staged()
+        stage_objects = 0
+        stage_ops = estimate_ops("".join(self._header_lines))
         dynamic_text: Dict[int, str] = {}
+        dynamic_inputs: Dict[int, Tuple[str, ...]] = {}
+        dynamic_rates: Dict[int, int] = {}
+        layout: list[Tuple[int, Tuple[int, Tuple[str, ...]]]] = []
+        for egp_id, snippet in snippets:
+            packed = bool(snippet.row) and snippet.row[0] in packed_kinds
+            self.report.max_position_error = max(self.report.max_position_error, snippet.position_error)
+            self.report.max_size_error = max(self.report.max_size_error, snippet.size_error)
+            if not packed:
+                self.report.chars_saved += snippet.chars_saved
+                self.report.ops_saved += snippet.ops_saved
+                self.report.calls_removed += snippet.calls_removed
+            if patch is None:
+                self._record(manifest, egp_id, snippet)
+            if snippet.parts != ("",) and (patch is None or egp_id in patch.created):
+                if staged:
+                    chunk_ops = packed_ops if packed else snippet.ops
+                    if stage_objects and self._stage_full(stage_objects, stage_ops + chunk_ops):
+                        if run:
+                            yield self._flush_run(run)
+                            run = []
+                        self.report.max_stage_ops = max(self.report.max_stage_ops, stage_ops)
+                        self.report.init_stages += 1
+                        yield self._stage_break(self.report.init_stages)
+                        stage_objects = 0
+                        stage_ops = 0
+                    stage_objects += 1
+                    stage_ops += chunk_ops
+                if packed:
+                    # Consecutive packed objects share one interpreter call.
+                    if run and run[0] + run[2] != egp_id:
+                        yield self._flush_run(run)
+                        run = []
+                    if not run:
+                        run = [egp_id, row_index, 0]
+                    run[2] += 1
+                    row_index += _PACK_STRIDE
+                    self.report.table_objects += 1
+                else:
+                    if run:
+                        yield self._flush_run(run)
+                        run = []
+                    chunk = str(egp_id).join(snippet.parts)
+                    for vector in snippet.vectors:
+                        if vector in hoisted:
+                            chunk = chunk.replace(vector, hoisted[vector])
+                    yield chunk
+            if snippet.layout:
+                layout.append((egp_id, snippet.layout))
+            if snippet.is_dynamic:
+                dynamic_text[egp_id] = snippet.text_expr
+                dynamic_inputs[egp_id] = snippet.inputs
+                dynamic_rates[egp_id] = snippet.rate
+
+        if run:
+            yield self._flush_run(run)
+        if patch is not None:
+            yield "".join(self._order_lines(patch))
+        self.manifest = manifest
+        if layout:
+            yield "".join(self._build_layout_table(layout))
+        if staged:
+            self.report.max_stage_ops = max(self.report.max_stage_ops, stage_ops)
+            if self.report.init_stages > 1:
+                yield "    Init = 0\n"
+        yield "}\n\n"
+        if dynamic_text:
+            yield "".join(self._build_dynamic_block(project, dynamic_text, dynamic_inputs, dynamic_rates))
+        if layout:
+            yield "".join(self._build_resize_block())
+
+    def _staged(self) -> bool:
+        """Description: Whether object creation is split across ticks
+        Inputs: None
+        """
+        return self.options.init_objects_per_tick > 0 or self.options.init_ops_per_tick > 0
+
+    def _stage_full(self, objects: int, ops: int) -> bool:
+        """Description: Whether adding another object would exceed the per-tick init limits
+        Inputs: objects: int, ops: int
+        """
+        if self.options.init_objects_per_tick > 0 and objects >= self.options.init_objects_per_tick:
+            return True
+        return self.options.init_ops_per_tick > 0 and ops > self.options.init_ops_per_tick
+
+    def _stage_break(self, stage: int) -> str:
+        """Description: Close the current init stage and open the next one on the following timer tick
+        Inputs: stage: int
+        """
+        return (
+            f"    Init = {stage}\n"
+            f"    interval({_MIN_INTERVAL})\n"
+            "}\n"
+            f"elseif (Init == {stage} & clk())\n"
+            "{\n"
+        )
+
+    def _iter_snippets(self, project: Project) -> Iterator[Tuple[int, _Snippet]]:
+        """Description: Yield (egp_id, snippet) for every shape on a visible layer in draw order
+        Inputs: project: Project
+        """
+        inputs_key = tuple((input_def.name, input_def.type, input_def.rate) for input_def in project.inputs)
+        # Built once per export: astuple deep-copies, which would cost more than a cache hit saves if done per shape.
+        settings_key = (astuple(self.options), astuple(project.precision))
+        self._shape_ids = {}
+        self._parents = {}
+        if self.options.parent_layers:
+            yield from self._iter_parented_snippets(project, inputs_key, settings_key)
+            return
+        items = self._draw_items(project)
+        egp_ids: Iterable[int] = count(1)
+        if self.options.stable_ids or self._id_base() is not None:
+            items = list(items)
+            egp_ids = self._allocate_ids(project, [shape.id for _color, shape in items])
+        objects = 0
+        for egp_id, (layer_color, shape) in zip(egp_ids, items):
+            objects += 1
+            self._shape_ids[egp_id] = shape.id
+            yield egp_id, self._shape_snippet(project, layer_color, shape, inputs_key, settings_key)
+        self.report.objects_after = objects
+        if not self.report.objects_before:
+            self.report.objects_before = objects
+
+    def _iter_parented_snippets(self, project: Project, inputs_key: tuple, settings_key: tuple) -> Iterator[Tuple[int, _Snippet]]:
+        """Description: Yield one anchor per layer first, then each layer's shapes parented to its anchor
+        Inputs: project: Project, inputs_key: tuple, settings_key: tuple
+        """
+        groups = []
+        for layer, items in self._layer_groups(project):
+            origin = self._layer_origin(items)
+            anchor = Shape(id=f"anchor:{layer.id}", kind="anchor", points=[origin], stroke="#FFFFFF", stroke_width=1)
+            groups.append((anchor, origin, items))
+        shape_ids = [anchor.id for anchor, _origin, _items in groups]
+        shape_ids.extend(shape.id for _anchor, _origin, items in groups for _color, shape in items)
+        egp_ids = iter(self._allocate_ids(project, shape_ids))
+        anchor_ids = []
+        for anchor, _origin, _items in groups:
+            anchor_id = next(egp_ids)
+            anchor_ids.append(anchor_id)
+            self._shape_ids[anchor_id] = anchor.id
+            yield anchor_id, self._shape_snippet(project, None, anchor, inputs_key, settings_key)
+        for anchor_id, (_anchor, origin, items) in zip(anchor_ids, groups):
+            for layer_color, shape in items:
+                egp_id = next(egp_ids)
+                self._shape_ids[egp_id] = shape.id
+                self._parents[egp_id] = anchor_id
+                yield egp_id, self._shape_snippet(project, layer_color, shape, inputs_key, settings_key, (anchor_id, origin))
+        self.report.objects_before += len(groups)
+        self.report.objects_after = len(shape_ids)
+
+    def _id_base(self) -> ExportManifest | None:
+        """Description: Manifest whose egp ids this export keeps: the screen being patched, else the configured one
+        Inputs: None
+        """
+        return self._patch_base if self._patch_base is not None else self.base_manifest
+
+    def _allocate_ids(self, project: Project, shape_ids: list[str]) -> list[int]:
+        """Description: Egp id per shape in draw order; known shapes keep their id, new ones take the smallest free ids
+        Inputs: project: Project, shape_ids: list[str]
+        """
+        if self.options.stable_ids:
+            return self._allocate_stable_ids(project, shape_ids)
+        base = self._id_base()
+        known = base.ids if base is not None else {}
+        ids: list[int | None] = []
+        taken: set[int] = set()
+        for shape_id in shape_ids:
+            egp_id = known.get(shape_id)
+            if egp_id is None or egp_id in taken:
+                ids.append(None)
+            else:
+                ids.append(egp_id)
+                taken.add(egp_id)
+        free = (egp_id for egp_id in count(1) if egp_id not in taken)
+        return [egp_id if egp_id is not None else next(free) for egp_id in ids]
+
+    def _allocate_stable_ids(self, project: Project, shape_ids: list[str]) -> list[int]:
+        """Description: Egp ids from the project's allocator, releasing ids of deleted shapes first; hidden shapes keep theirs
+        Inputs: project: Project, shape_ids: list[str]
+        """
+        shapes = {shape.id for layer in project.layers for shape in layer.shapes}
+        shapes.update(f"anchor:{layer.id}" for layer in project.layers)
+        allocator = project.egp_ids
+        base = self._id_base()
+        if base is not None:
+            # Headless tools never save the allocator back, so the manifest carries the ids between runs.
+            allocator.adopt(base.ids)
+        allocator.prune(lambda key: _ALLOC_KEY_RE.match(key).group(1) in shapes)
+        seen: Dict[str, int] = {}
+        ids = []
+        for shape_id in shape_ids:
+            repeat = seen.get(shape_id, 0)
+            seen[shape_id] = repeat + 1
+            ids.append(allocator.allocate(f"{shape_id}#{repeat}" if repeat else shape_id))
+        return ids
+
+    def _record(self, manifest: ExportManifest, egp_id: int, snippet: _Snippet) -> None:
+        """Description: Add an emitted object to the manifest, hashed with its id left out
+        Inputs: manifest: ExportManifest, egp_id: int, snippet: _Snippet
+        """
+        if snippet.parts == ("",):
+            return
+        digest = sha1(_ID_SLOT.join(snippet.parts).encode("utf-8")).hexdigest()[:16]
+        manifest.objects[egp_id] = ManifestEntry(self._shape_ids.get(egp_id, ""), digest, self._parents.get(egp_id, 0))
+
+    def _plan_patch(self, manifest: ExportManifest) -> PatchPlan:
+        """Description: Diff this export against the patched screen and count the result into the report
+        Inputs: manifest: ExportManifest
+        """
+        patch = plan_patch(self._patch_base or ExportManifest(), manifest)
+        self.report.patch_removed = len(patch.removed)
+        self.report.patch_created = len(patch.created) - len(patch.updated)
+        self.report.patch_updated = len(patch.updated)
+        self.report.patch_unchanged = len(patch.unchanged)
+        return patch
+
+    def _order_lines(self, patch: PatchPlan) -> list[str]:
+        """Description: Move created objects from the end of the draw order into place, lowest position first
+        Inputs: patch: PatchPlan
+        """
+        placed = sorted(patch.created.items(), key=lambda item: item[1])
+        first = len(patch.unchanged) + 1
+        if [position for _egp_id, position in placed] == list(range(first, first + len(placed))):
+            return []
+        return [f"    EGP:egpOrder( {egp_id}, {position} )\n" for egp_id, position in placed]
+
+    def _draw_items(self, project: Project) -> Iterable[DrawItem]:
+        """Description: (layer colour, shape) pairs for visible layers in draw order, after any enabled passes
+        Inputs: project: Project
+        """
+        items: Iterable[DrawItem] = (
+            (layer.color, shape)
+            for layer in project.layers
+            if layer.visible
+            for shape in layer.shapes
+        )
+        if not self._has_passes():
+            return items
+        items = list(items)
+        self.report.objects_before = len(items)
+        return self._run_passes(project, items)
+
+    def _layer_groups(self, project: Project) -> list[Tuple[Layer, list[DrawItem]]]:
+        """Description: Draw items per visible layer; passes run per layer so nothing is merged or culled across layers that may move independently
+        Inputs: project: Project
+        """
+        groups = []
         for layer in project.layers:
             if not layer.visible:
                 continue
-            for shape in layer.shapes:
-                egp_id += 1
-                text_expr, is_dynamic = self._text_expression(project, shape)
-                self._export_shape(egp_id, project.resolution, layer.color, shape, text_expr)
-                if is_dynamic:
-                    dynamic_text[egp_id] = text_expr
+            items = [(layer.color, shape) for shape in layer.shapes]
+            self.report.objects_before += len(items)
+            if self._has_passes():
+                items = self._run_passes(project, items)
+            if items:
+                groups.append((layer, items))
+        return groups
 
-        self._write_lines(["}\n\n"])
-        if dynamic_text:
-            self._write_lines(self._build_dynamic_block(dynamic_text))
+    def _has_passes(self) -> bool:
+        """Description: Whether any draw-list pass is enabled
+        Inputs: None
+        """
+        options = self.options
+        return (
+            options.pack_objects
+            or options.cull_occluded
+            or options.drop_dead_shapes
+            or options.simplify_tolerance > 0
+            or options.max_poly_vertices > 0
+        )
 
-    def _build_header(self, project: Project) -> list[str]:
-        """Description: Build header
-        Inputs: project: Project
+    def _run_passes(self, project: Project, items: list[DrawItem]) -> list[DrawItem]:
+        """Description: Apply the enabled draw-list passes and accumulate their results into the report
+        Inputs: project: Project, items: list[DrawItem]
+        """
+        options = self.options
+        report = self.report
+        if options.drop_dead_shapes:
+            items, dead = eliminate_dead(items, project.resolution)
+            for reason, ids in dead.removed.items():
+                report.dead_shapes.removed.setdefault(reason, []).extend(ids)
+        if options.simplify_tolerance > 0:
+            items, simplify_report = simplify_polys(items, options.simplify_tolerance)
+            report.vertices_removed += simplify_report.vertices_removed
+            report.max_deviation = max(report.max_deviation, simplify_report.max_deviation)
+        if options.max_poly_vertices > 0:
+            items, polys_split = split_polys(items, options.max_poly_vertices)
+            report.polys_split += polys_split
+        if options.cull_occluded:
+            items, culled_ids = cull_occluded(items)
+            report.culled_ids.extend(culled_ids)
+        if options.pack_objects:
+            items, pack_report = pack_objects(items)
+            report.merged_boxes += pack_report.merged_boxes
+            report.collapsed_rects += pack_report.collapsed_rects
+        return items
+
+    def _layer_origin(self, items: list[DrawItem]) -> Tuple[float, float]:
+        """Description: Centroid of the bounds centres of a layer's shapes, used as its anchor position
+        Inputs: items: list[DrawItem]
+        """
+        centres = []
+        for _color, shape in items:
+            bounds = shape_bounds(shape)
+            if bounds is not None:
+                centres.append(((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2))
+        if not centres:
+            return (0.0, 0.0)
+        return (
+            round(sum(x for x, _y in centres) / len(centres), 3),
+            round(sum(y for _x, y in centres) / len(centres), 3),
+        )
+
+    def _hoist_table(self, project: Project, snippets: list[Tuple[int, _Snippet]]) -> Dict[str, str]:
+        """Description: Map vector expressions used more than once to persisted variable names
+        Inputs: project: Project, snippets: list[Tuple[int, _Snippet]]
+        """
+        counts: Dict[str, int] = {}
+        for _egp_id, snippet in snippets:
+            for vector in snippet.vectors:
+                counts[vector] = counts.get(vector, 0) + 1
+        reserved = _RESERVED_NAMES | {input_def.name for input_def in project.inputs}
+        hoisted: Dict[str, str] = {}
+        index = 0
+        for vector, uses in counts.items():
+            ops = estimate_ops(vector)
+            if uses < 2 or ops <= ASSIGN_WEIGHT:
+                continue
+            index += 1
+            while f"V{index}" in reserved:
+                index += 1
+            name = f"V{index}"
+            hoisted[vector] = name
+            assign_line = f"    {name} = {vector}\n"
+            self.report.chars_saved += uses * (len(vector) - len(name)) - len(assign_line) - len(f" {name}:vector2")
+            self.report.ops_saved += uses * ops - (ops + ASSIGN_WEIGHT)
+        if hoisted:
+            self.report.chars_saved -= len("@persist\n")
+        self.report.hoisted = len(hoisted)
+        return hoisted
+
+    def _shape_snippet(
+        self,
+        project: Project,
+        layer_color: str | None,
+        shape: Shape,
+        inputs_key: tuple,
+        settings_key: tuple,
+        parent: Tuple[int, Tuple[float, float]] | None = None,
+    ) -> _Snippet:
+        """Description: Render a shape with an id placeholder, reusing the cache when the content is unchanged
+        Inputs: project: Project, layer_color: str | None, shape: Shape, inputs_key: tuple, settings_key: tuple, parent: (anchor egp id, anchor position) or None
+        """
+        key = None
+        if self.cache is not None:
+            key = self._snippet_key(project, layer_color, shape, inputs_key, settings_key, parent)
+            snippet = self.cache.get(key)
+            if snippet is not None:
+                return snippet
+        text_expr, is_dynamic = self._text_expression(project, shape)
+        referenced = self._referenced_inputs(project, shape) if is_dynamic else ()
+        self._render_vectors = []
+        self._render_savings = [0, 0, 0]
+        self._render_errors = [0.0, 0.0]
+        self._render_origin = self._anchor_position(project.resolution, parent[1]) if parent is not None else None
+        lines = self._export_shape(_ID_SLOT, project.resolution, layer_color, shape, text_expr)
+        self._render_origin = None
+        if parent is not None and lines:
+            lines.append(f"    EGP:egpParent( {_ID_SLOT}, {parent[0]} )\n")
+        code = "".join(lines)
+        snippet = _Snippet(
+            tuple(code.split(_ID_SLOT)),
+            text_expr,
+            is_dynamic,
+            referenced,
+            self._text_rate(project, shape, referenced),
+            tuple(self._render_vectors),
+            # Only staging needs the weighted per-object estimate; tokenizing every snippet is the slowest part of an export.
+            estimate_ops(code) if self._staged() else 0,
+            self._render_savings[0],
+            self._render_savings[1],
+            self._render_savings[2],
+            self._layout_entry(project.resolution, shape, parent) if self.options.watch_resolution else (),
+            self._packed_row(project.resolution, layer_color, shape) if self.options.table_emission and parent is None else (),
+            self._render_errors[0],
+            self._render_errors[1],
+        )
+        if key is not None:
+            self.cache.put(key, snippet)
+        return snippet
+
+    def _snippet_key(
+        self,
+        project: Project,
+        layer_color: str | None,
+        shape: Shape,
+        inputs_key: tuple,
+        settings_key: tuple,
+        parent: Tuple[int, Tuple[float, float]] | None = None,
+    ) -> tuple:
+        """Description: Content key covering every field that influences a shape's emitted code; settings_key is the per-export options and precision key
+        Inputs: project: Project, layer_color: str | None, shape: Shape, inputs_key: tuple, settings_key: tuple, parent: (anchor egp id, anchor position) or None
+        """
+        return (
+            shape.kind,
+            tuple(shape.points),
+            shape.stroke,
+            shape.stroke_width,
+            shape.alpha,
+            shape.fill,
+            shape.text,
+            shape.font,
+            shape.font_size,
+            shape.align,
+            shape.update_rate,
+            layer_color,
+            tuple(project.resolution),
+            inputs_key,
+            parent,
+            settings_key,
+        )
+
+    def _build_header(
+        self,
+        project: Project,
+        hoisted: Dict[str, str] | None = None,
+        packed_rows: list[str] | None = None,
+        packed_kinds: set[str] | None = None,
+        removed: list[int] | None = None,
+    ) -> list[str]:
+        """Description: Build header; a patch removes only the listed egp ids instead of clearing the screen
+        Inputs: project: Project, hoisted: Dict[str, str] | None = None, packed_rows: list[str] | None = None, packed_kinds: set[str] | None = None, removed: list[int] | None = None
         """
         inputs = ["EGP:wirelink"]
         for input_def in project.inputs:
@@ -52,58 +781,154 @@ class HudExporter:
             inputs.append(f"{input_def.name}:{input_type}")
         inputs_line = "@inputs " + " ".join(inputs) + "\n"
         resolution = project.resolution
-        return [
+        hoisted = hoisted or {}
+        base_rate, multi_rate = self._schedule_base(self._dynamic_rates(project))
+        persist = "@persist X Y Res:vector2 ProjRes:vector2 Scale:vector2"
+        if multi_rate and self.options.dynamic_updates != "changed":
+            persist += " Tick"
+        if self._staged():
+            persist += " Init"
+        if self.options.watch_resolution:
+            persist += " LastScr:vector2 ResizeAt LayoutId:array LayoutKind:array LayoutAt:array LayoutVec:array"
+        if packed_rows:
+            persist += " Pk:array"
+        lines = [
             "@name Untitled\n",
             inputs_line,
-            "@persist X Y Res:vector2 ProjRes:vector2 Scale:vector2\n\n",
+            persist + "\n",
+        ]
+        if hoisted:
+            lines.append("@persist " + " ".join(f"{name}:vector2" for name in hoisted.values()) + "\n")
+        if packed_rows:
+            lines.extend(["\n", *self._packed_function(packed_kinds or set())])
+        lines.extend([
+            "\n",
             "if ( first() )\n",
             "{\n",
-            "    EGP:egpClear()\n",
+        ])
+        if removed is None:
+            lines.append("    EGP:egpClear()\n")
+        else:
+            lines.extend(f"    EGP:egpRemove( {egp_id} )\n" for egp_id in removed)
+        lines.extend([
             "    Res = egpScrSize(owner())\n",
             "    X   = Res:x()\n",
             "    Y   = Res:y()\n",
             "    Res /= 2\n",
             f"    ProjRes = vec2( {resolution[0]}, {resolution[1]} )\n",
             "    Scale = vec2(X/ProjRes:x(), Y/ProjRes:y())\n",
-            "    interval(100)\n\n",
-        ]
-
-    def _write_lines(self, lines: Iterable[str]) -> None:
-        """Description: Write lines
-        Inputs: lines: Iterable[str]
-        """
-        with open(self.path, "a", encoding="utf-8") as file:
-            file.writelines(lines)
+        ])
+        for vector, name in hoisted.items():
+            lines.append(f"    {name} = {vector}\n")
+        if self.options.watch_resolution:
+            lines.append("    LastScr = vec2(X, Y)\n")
+        if packed_rows:
+            lines.extend(self._array_lines("Pk", packed_rows))
+        if self.options.dynamic_updates == "changed":
+            lines.append("\n")
+        else:
+            lines.append(f"    interval({base_rate})\n\n")
+        return lines
 
     def _fmt_num(self, value: float) -> str:
-        """Description: Format numeric output with 3 decimal places
+        """Description: Format numeric output at the project's decimal precision (3 places by default)
         Inputs: value: float
         """
-        rounded = round(float(value), 3)
-        if abs(rounded) < 0.0005:
+        decimals = self._precision.decimals
+        rounded = round(float(value), decimals)
+        if abs(rounded) < 0.5 * 10 ** -decimals:
             rounded = 0.0
-        return f"{rounded:.3f}"
+        return f"{rounded:.{decimals}f}"
+
+    def _snap(self, value: float) -> float:
+        """Description: Apply the project's pixel-grid and near-integer snapping to a coordinate or size
+        Inputs: value: float
+        """
+        policy = self._precision
+        if policy.snap == "whole":
+            value = floor(value + 0.5)
+        elif policy.snap == "half":
+            value = floor(value * 2 + 0.5) / 2
+        nearest = floor(value + 0.5)
+        if policy.integer_tolerance > 0 and abs(value - nearest) <= policy.integer_tolerance:
+            value = nearest
+        return float(value)
+
+    def _place(self, point: Tuple[float, float], origin: Tuple[float, float]) -> Tuple[str, str]:
+        """Description: Formatted offsets of a snapped point from origin, recording the positional error
+        Inputs: point: Tuple[float, float], origin: Tuple[float, float]
+        """
+        dx = self._fmt_num(self._snap(point[0]) - origin[0])
+        dy = self._fmt_num(self._snap(point[1]) - origin[1])
+        error = hypot(float(dx) + origin[0] - point[0], float(dy) + origin[1] - point[1])
+        self._render_errors[0] = max(self._render_errors[0], error)
+        return dx, dy
+
+    def _anchor_position(self, resolution: Tuple[int, int], origin: Tuple[float, float]) -> Tuple[float, float]:
+        """Description: Where an anchor placed at origin lands once snapped and formatted; children are offset from this point
+        Inputs: resolution: Tuple[int, int], origin: Tuple[float, float]
+        """
+        center = (resolution[0] / 2, resolution[1] / 2)
+        return (
+            center[0] + float(self._fmt_num(self._snap(origin[0]) - center[0])),
+            center[1] + float(self._fmt_num(self._snap(origin[1]) - center[1])),
+        )
+
+    def _extent(self, value: float) -> str:
+        """Description: Formatted snapped size, recording the size error
+        Inputs: value: float
+        """
+        text = self._fmt_num(self._snap(value))
+        self._render_errors[1] = max(self._render_errors[1], abs(float(text) - value))
+        return text
 
     def _offset_expr(self, resolution: Tuple[int, int], point: Tuple[float, float]) -> str:
         """Description: Offset expr
         Inputs: resolution: Tuple[int, int], point: Tuple[float, float]
         """
-        dx = point[0] - resolution[0] / 2
-        dy = point[1] - resolution[1] / 2
-        return f"Res + vec2( {self._fmt_num(dx)} * Scale:x(), {self._fmt_num(dy)} * Scale:y())"
+        if self._render_origin is not None:
+            # Parented shapes are positioned relative to their layer anchor.
+            dx, dy = self._place(point, self._render_origin)
+            expr = f"vec2( {dx} * Scale:x(), {dy} * Scale:y())"
+            if not self.options.optimize_vectors:
+                return expr
+            return self._shorten(expr, f"vec2({dx}, {dy}) * Scale")
+        dx, dy = self._place(point, (resolution[0] / 2, resolution[1] / 2))
+        expr = f"Res + vec2( {dx} * Scale:x(), {dy} * Scale:y())"
+        if not self.options.optimize_vectors:
+            return expr
+        short = "Res" if float(dx) == 0 and float(dy) == 0 else f"Res + vec2({dx}, {dy}) * Scale"
+        return self._shorten(expr, short)
 
     def _size_expr(self, value: float) -> str:
         """Description: Size expr
         Inputs: value: float
         """
-        v = self._fmt_num(value)
-        return f"vec2( {v} * Scale:x(), {v} * Scale:x())"
+        v = self._extent(value)
+        expr = f"vec2( {v} * Scale:x(), {v} * Scale:x())"
+        if not self.options.optimize_vectors:
+            return expr
+        return self._shorten(expr, f"vec2({v}, {v}) * Scale:x()")
 
     def _size_xy_expr(self, width: float, height: float) -> str:
         """Description: Size xy expr
         Inputs: width: float, height: float
         """
-        return f"vec2( {self._fmt_num(width)} * Scale:x(), {self._fmt_num(height)} * Scale:y())"
+        w = self._extent(width)
+        h = self._extent(height)
+        expr = f"vec2( {w} * Scale:x(), {h} * Scale:y())"
+        if not self.options.optimize_vectors:
+            return expr
+        return self._shorten(expr, f"vec2({w}, {h}) * Scale")
+
+    def _shorten(self, expr: str, short: str) -> str:
+        """Description: Record the savings of replacing a vector expression with its shorter form
+        Inputs: expr: str, short: str
+        """
+        self._render_vectors.append(short)
+        self._render_savings[0] += len(expr) - len(short)
+        self._render_savings[1] += expr_ops(expr) - expr_ops(short)
+        return short
 
     def _color_vec(self, color: str) -> Tuple[int, int, int]:
         """Description: Color vec
@@ -120,31 +945,34 @@ class HudExporter:
         """
         return max(0, min(255, int(getattr(shape, "alpha", 255))))
 
-    def _export_shape(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None) -> None:
+    def _export_shape(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None) -> list[str]:
         """Description: Export shape
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None
         """
         if shape.kind == "line":
-            self._export_line(egp_id, resolution, layer_color, shape)
-        elif shape.kind == "rect":
-            self._export_rect(egp_id, resolution, layer_color, shape)
-        elif shape.kind == "box":
-            self._export_box(egp_id, resolution, layer_color, shape)
-        elif shape.kind == "circle":
-            self._export_circle(egp_id, resolution, layer_color, shape, filled=False)
-        elif shape.kind == "circle_filled":
-            self._export_circle(egp_id, resolution, layer_color, shape, filled=True)
-        elif shape.kind == "poly":
-            self._export_poly(egp_id, resolution, layer_color, shape)
-        elif shape.kind == "text":
-            self._export_text(egp_id, resolution, layer_color, shape, text_expr)
-
-    def _export_line(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> None:
+            return self._export_line(egp_id, resolution, layer_color, shape)
+        if shape.kind == "rect":
+            return self._export_rect(egp_id, resolution, layer_color, shape)
+        if shape.kind == "box":
+            return self._export_box(egp_id, resolution, layer_color, shape)
+        if shape.kind == "circle":
+            return self._export_circle(egp_id, resolution, layer_color, shape, filled=False)
+        if shape.kind == "circle_filled":
+            return self._export_circle(egp_id, resolution, layer_color, shape, filled=True)
+        if shape.kind == "poly":
+            return self._export_poly(egp_id, resolution, layer_color, shape)
+        if shape.kind == "text":
+            return self._export_text(egp_id, resolution, layer_color, shape, text_expr)
+        if shape.kind == "anchor":
+            return self._export_anchor(egp_id, resolution, shape)
+        return []
+
+    def _export_line(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> list[str]:
         """Description: Export line
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape
         """
         if len(shape.points) < 2:
-            return
+            return []
         (x1, y1), (x2, y2) = shape.points[0], shape.points[1]
         rgb = self._color_vec(layer_color or shape.stroke)
         stroke = max(1, int(shape.stroke_width))
@@ -166,58 +994,53 @@ class HudExporter:
             center = self._offset_expr(resolution, (cx, cy))
             lines = [
                 f"    EGP:egpBox( {egp_id}, {center}, {self._size_xy_expr(width, height)} )\n",
-                f"    EGP:egpColor( {egp_id},vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-                f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+                *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
             ]
-            self._write_lines(lines)
-            return
+            return lines
         p1 = self._offset_expr(resolution, (x1, y1))
         p2 = self._offset_expr(resolution, (x2, y2))
         lines = [
             f"    EGP:egpLine( {egp_id}, {p1}, {p2} )\n",
-            f"    EGP:egpColor( {egp_id},vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
         ]
-        self._write_lines(lines)
+        return lines
 
-    def _export_rect(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> None:
+    def _export_rect(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> list[str]:
         """Description: Export rect
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape
         """
         if len(shape.points) < 2:
-            return
+            return []
         cx, cy, w, h = self._bounds_center(shape.points[0], shape.points[1])
         center = self._offset_expr(resolution, (cx, cy))
         rgb = self._color_vec(layer_color or shape.stroke)
         lines = [
             f"    EGP:egpBoxOutline( {egp_id}, {center}, {self._size_xy_expr(w, h)} )\n",
-            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
         ]
-        self._write_lines(lines)
+        return lines
 
-    def _export_box(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> None:
+    def _export_box(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> list[str]:
         """Description: Export box
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape
         """
         if len(shape.points) < 2:
-            return
+            return []
         cx, cy, w, h = self._bounds_center(shape.points[0], shape.points[1])
         center = self._offset_expr(resolution, (cx, cy))
         rgb = self._color_vec(layer_color or shape.fill or shape.stroke)
         lines = [
             f"    EGP:egpBox( {egp_id}, {center}, {self._size_xy_expr(w, h)} )\n",
-            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
         ]
-        self._write_lines(lines)
+        return lines
 
-    def _export_circle(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, filled: bool = False) -> None:
+    def _export_circle(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, filled: bool = False) -> list[str]:
         """Description: Export circle
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, filled: bool = False
         """
         if len(shape.points) < 2:
-            return
+            return []
         cx, cy, w, h = self._bounds_center(shape.points[0], shape.points[1])
         center = self._offset_expr(resolution, (cx, cy))
         color = layer_color or shape.fill or shape.stroke
@@ -225,33 +1048,41 @@ class HudExporter:
         circle_call = "egpCircle" if filled else "egpCircleOutline"
         lines = [
             f"    EGP:{circle_call}( {egp_id}, {center}, {self._size_xy_expr(w/2, h/2)} )\n",
-            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
         ]
-        self._write_lines(lines)
+        return lines
 
-    def _export_poly(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> None:
+    def _export_poly(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> list[str]:
         """Description: Export poly
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape
         """
         if len(shape.points) < 3:
-            return
+            return []
         points = [self._offset_expr(resolution, point) for point in shape.points]
         poly_points = ",".join(points)
         rgb = self._color_vec(layer_color or shape.fill or shape.stroke)
         lines = [
             f"    EGP:egpPoly( {egp_id}, array( {poly_points} ))\n",
-            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
         ]
-        self._write_lines(lines)
+        return lines
 
-    def _export_text(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None) -> None:
+    def _export_anchor(self, egp_id: int, resolution: Tuple[int, int], shape: Shape) -> list[str]:
+        """Description: Invisible zero-size box that a layer's shapes are parented to
+        Inputs: egp_id: int, resolution: Tuple[int, int], shape: Shape
+        """
+        center = self._offset_expr(resolution, shape.points[0])
+        return [
+            f"    EGP:egpBox( {egp_id}, {center}, vec2( 0, 0 ) )\n",
+            f"    EGP:egpAlpha( {egp_id}, 0 )\n",
+        ]
+
+    def _export_text(self, egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None) -> list[str]:
         """Description: Export text
         Inputs: egp_id: int, resolution: Tuple[int, int], layer_color: str | None, shape: Shape, text_expr: str | None
         """
         if not shape.points:
-            return
+            return []
         point = self._offset_expr(resolution, shape.points[0])
         text = text_expr or self._quote_text(shape.text)
         rgb = self._color_vec(layer_color or shape.stroke)
@@ -263,15 +1094,51 @@ class HudExporter:
         align_v = 1
         lines = [
             f"    EGP:egpText( {egp_id}, {text}, {point} )\n",
-            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
-            f"    EGP:egpAlpha( {egp_id}, {self._alpha_value(shape)} )\n",
+            *self._style_lines(egp_id, rgb, self._alpha_value(shape)),
             f"    EGP:egpAlign( {egp_id}, {align_h}, {align_v} )\n",
         ]
-        if shape.font:
-            lines.append(f"    EGP:egpFont( {egp_id},\"{shape.font}\", {shape.font_size} )\n")
+        lines.extend(self._font_lines(egp_id, shape))
+        return lines
+
+    def _style_lines(self, egp_id: int, rgb: Tuple[int, int, int], alpha: int) -> list[str]:
+        """Description: Colour and alpha calls, fused into one vec4 colour and dropped at EGP defaults when enabled
+        Inputs: egp_id: int, rgb: Tuple[int, int, int], alpha: int
+        """
+        lines = [
+            f"    EGP:egpColor( {egp_id}, vec({rgb[0]}, {rgb[1]}, {rgb[2]}))\n",
+            f"    EGP:egpAlpha( {egp_id}, {alpha} )\n",
+        ]
+        if not self.options.fuse_calls:
+            return lines
+        if rgb == _DEFAULT_RGB and alpha == _DEFAULT_ALPHA:
+            fused = []
+        elif alpha == _DEFAULT_ALPHA:
+            fused = lines[:1]
         else:
-            lines.append(f"    EGP:egpFont( {egp_id},\"Default\", {shape.font_size} )\n")
-        self._write_lines(lines)
+            fused = [f"    EGP:egpColor( {egp_id}, vec4({rgb[0]}, {rgb[1]}, {rgb[2]}, {alpha}))\n"]
+        return self._replace_calls(lines, fused)
+
+    def _font_lines(self, egp_id: int, shape: Shape) -> list[str]:
+        """Description: Font call for text; an unnamed font only needs a size change away from the default
+        Inputs: egp_id: int, shape: Shape
+        """
+        if shape.font:
+            return [f"    EGP:egpFont( {egp_id},\"{shape.font}\", {shape.font_size} )\n"]
+        lines = [f"    EGP:egpFont( {egp_id},\"Default\", {shape.font_size} )\n"]
+        if not self.options.fuse_calls:
+            return lines
+        if shape.font_size == _DEFAULT_FONT_SIZE:
+            return self._replace_calls(lines, [])
+        return self._replace_calls(lines, [f"    EGP:egpSize( {egp_id}, {shape.font_size} )\n"])
+
+    def _replace_calls(self, lines: list[str], replacement: list[str]) -> list[str]:
+        """Description: Record the savings of emitting replacement instead of lines
+        Inputs: lines: list[str], replacement: list[str]
+        """
+        self._render_savings[0] += sum(len(line) for line in lines) - sum(len(line) for line in replacement)
+        self._render_savings[1] += sum(expr_ops(line) for line in lines) - sum(expr_ops(line) for line in replacement)
+        self._render_savings[2] += len(lines) - len(replacement)
+        return replacement
 
     def _bounds_center(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> Tuple[float, float, float, float]:
         """Description: Bounds center
@@ -291,7 +1158,7 @@ class HudExporter:
         """Description: Quote text
         Inputs: text: str
         """
-        escaped = text.replace("\\", "\\\\").replace("\"", "\\\"")
+        escaped = text.replace(_ID_SLOT, "").replace("\\", "\\\\").replace("\"", "\\\"")
         return f"\"{escaped}\""
 
     def _text_expression(self, project: Project, shape: Shape) -> Tuple[str, bool]:
@@ -300,12 +1167,11 @@ class HudExporter:
         """
         if shape.kind != "text":
             return self._quote_text(shape.text), False
-        token_re = re.compile(r"%([A-Za-z0-9_]+)%(R(\d))?")
         inputs = {input_def.name: input_def.type for input_def in project.inputs}
         parts: list[str] = []
         last = 0
         is_dynamic = False
-        matches = list(token_re.finditer(shape.text))
+        matches = list(_TOKEN_RE.finditer(shape.text))
 
         for match in matches:
             name = match.group(1)
@@ -340,12 +1206,370 @@ class HudExporter:
 
         return expr, True
 
-    def _build_dynamic_block(self, dynamic_text: Dict[int, str]) -> list[str]:
+    def _referenced_inputs(self, project: Project, shape: Shape) -> Tuple[str, ...]:
+        """Description: Names of declared inputs referenced by a text shape's tokens, in first-use order
+        Inputs: project: Project, shape: Shape
+        """
+        declared = {input_def.name for input_def in project.inputs}
+        names: list[str] = []
+        for match in _TOKEN_RE.finditer(shape.text):
+            name = match.group(1)
+            if name in declared and name not in names:
+                names.append(name)
+        return tuple(names)
+
+    def _text_rate(self, project: Project, shape: Shape, referenced: Tuple[str, ...]) -> int:
+        """Description: Update period in ms: the shape override, else the fastest referenced input
+        Inputs: project: Project, shape: Shape, referenced: Tuple[str, ...]
+        """
+        if shape.update_rate > 0:
+            return max(_MIN_INTERVAL, int(shape.update_rate))
+        rates = [input_def.rate for input_def in project.inputs if input_def.name in referenced]
+        if not rates:
+            return _DEFAULT_RATE
+        return max(_MIN_INTERVAL, int(min(rates)))
+
+    def _dynamic_rates(self, project: Project) -> set[int]:
+        """Description: Update periods of visible dynamic text, before any shape is rendered (the header needs them first)
+        Inputs: project: Project
+        """
+        rates = set()
+        for layer in project.layers:
+            if not layer.visible:
+                continue
+            for shape in layer.shapes:
+                if shape.kind != "text":
+                    continue
+                referenced = self._referenced_inputs(project, shape)
+                if referenced:
+                    rates.add(self._text_rate(project, shape, referenced))
+        return rates
+
+    def _schedule_base(self, rates: Iterable[int]) -> Tuple[int, bool]:
+        """Description: Scheduler tick period (gcd of the dynamic text rates) and whether more than one rate exists
+        Inputs: rates: Iterable[int]
+        """
+        rates = set(rates)
+        if not rates:
+            return _DEFAULT_RATE, False
+        base = 0
+        for rate in rates:
+            base = gcd(base, rate)
+        return max(_MIN_INTERVAL, base), len(rates) > 1
+
+    def _layout_entry(
+        self,
+        resolution: Tuple[int, int],
+        shape: Shape,
+        parent: Tuple[int, Tuple[float, float]] | None,
+    ) -> Tuple[int, Tuple[str, ...]] | Tuple[()]:
+        """Description: Layout kind and project-pixel vectors needed to re-place an object after a resize
+        Inputs: resolution: Tuple[int, int], shape: Shape, parent: (anchor egp id, anchor position) or None
+        """
+        origin = parent[1] if parent is not None else (resolution[0] / 2, resolution[1] / 2)
+
+        def vec(x: float, y: float, offset: bool = True) -> str:
+            if offset:
+                dx, dy = self._place((x, y), origin)
+                return f"vec2({dx}, {dy})"
+            return f"vec2({self._extent(x)}, {self._extent(y)})"
+
+        points = shape.points
+        kind, vectors = 0, ()
+        if shape.kind in ("text", "anchor") and points:
+            kind, vectors = _LAYOUT_POS, (vec(*points[0]),)
+        elif shape.kind == "poly" and len(points) >= 3:
+            kind, vectors = _LAYOUT_VERTICES, tuple(vec(*point) for point in points)
+        elif len(points) >= 2:
+            cx, cy, w, h = self._bounds_center(points[0], points[1])
+            if shape.kind == "line":
+                box = axis_line_box(shape)
+                if box is None:
+                    kind, vectors = _LAYOUT_VERTICES, (vec(*points[0]), vec(*points[1]))
+                else:
+                    kind, vectors = _LAYOUT_POS_SIZE, (vec(cx, cy), vec(box[2] - box[0], box[3] - box[1], False))
+            elif shape.kind in ("rect", "box"):
+                kind, vectors = _LAYOUT_POS_SIZE, (vec(cx, cy), vec(w, h, False))
+            elif shape.kind in ("circle", "circle_filled"):
+                kind, vectors = _LAYOUT_POS_SIZE, (vec(cx, cy), vec(w / 2, h / 2, False))
+        if not kind:
+            return ()
+        return (-kind if parent is not None else kind, vectors)
+
+    def _build_layout_table(self, layout: list[Tuple[int, Tuple[int, Tuple[str, ...]]]]) -> list[str]:
+        """Description: Persisted parallel arrays of object ids, layout kinds, vector offsets and the vectors themselves
+        Inputs: layout: list[Tuple[int, Tuple[int, Tuple[str, ...]]]]
+        """
+        ids, kinds, starts, vectors = [], [], [], []
+        for egp_id, (kind, entry_vectors) in layout:
+            ids.append(str(egp_id))
+            kinds.append(str(kind))
+            starts.append(str(len(vectors) + 1))
+            vectors.extend(entry_vectors)
+        starts.append(str(len(vectors) + 1))
+        lines = ["\n"]
+        for name, values in (("LayoutId", ids), ("LayoutKind", kinds), ("LayoutAt", starts), ("LayoutVec", vectors)):
+            lines.extend(self._array_lines(name, values))
+        # Started after the last init stage, so a resize never interleaves with object creation.
+        lines.append(f"    timer(\"resize\", {_RESIZE_POLL})\n")
+        return lines
+
+    def _array_lines(self, name: str, values: list[str]) -> list[str]:
+        """Description: Assign a persisted array from literals, _LAYOUT_CHUNK values per array() call
+        Inputs: name: str, values: list[str]
+        """
+        lines = []
+        for index in range(0, len(values), _LAYOUT_CHUNK):
+            chunk = ", ".join(values[index:index + _LAYOUT_CHUNK])
+            if index == 0:
+                lines.append(f"    {name} = array({chunk})\n")
+            else:
+                lines.append(f"    {name} = {name}:add(array({chunk}))\n")
+        return lines
+
+    def _packed_row(self, resolution: Tuple[int, int], layer_color: str | None, shape: Shape) -> Tuple[str, ...]:
+        """Description: Packed table row for shapes the interpreter can create, matching what the unrolled emitters draw
+        Inputs: resolution: Tuple[int, int], layer_color: str | None, shape: Shape
+        """
+        if shape.kind not in ("line", "rect", "box", "circle", "circle_filled") or len(shape.points) < 2:
+            return ()
+        p1, p2 = shape.points[0], shape.points[1]
+        cx, cy, w, h = self._bounds_center(p1, p2)
+        centre = (resolution[0] / 2, resolution[1] / 2)
+        if shape.kind == "line":
+            color = layer_color or shape.stroke
+            box = axis_line_box(shape)
+            if box is None:
+                kind, values = 5, (*self._place(p1, centre), *self._place(p2, centre))
+            else:
+                kind, values = 1, (*self._place((cx, cy), centre), self._extent(box[2] - box[0]), self._extent(box[3] - box[1]))
+        elif shape.kind == "rect":
+            color = layer_color or shape.stroke
+            kind, values = 2, (*self._place((cx, cy), centre), self._extent(w), self._extent(h))
+        else:
+            color = layer_color or shape.fill or shape.stroke
+            if shape.kind == "box":
+                kind, values = 1, (*self._place((cx, cy), centre), self._extent(w), self._extent(h))
+            else:
+                kind = 3 if shape.kind == "circle_filled" else 4
+                values = (*self._place((cx, cy), centre), self._extent(w / 2), self._extent(h / 2))
+        rgb = self._color_vec(color)
+        numbers = [trim_number(value) for value in values]
+        return (str(kind), *numbers, *(str(channel) for channel in rgb), str(self._alpha_value(shape)))
+
+    def _table_kinds(self, snippets: list[Tuple[int, _Snippet]]) -> set[str]:
+        """Description: Call kinds whose packed rows plus interpreter cost fewer characters than their unrolled code
+        Inputs: snippets: list[Tuple[int, _Snippet]]
+        """
+        unrolled: Dict[str, int] = {}
+        table: Dict[str, int] = {}
+        for egp_id, snippet in snippets:
+            if not snippet.row:
+                continue
+            kind = snippet.row[0]
+            unrolled[kind] = unrolled.get(kind, 0) + len(str(egp_id).join(snippet.parts))
+            table[kind] = table.get(kind, 0) + sum(len(value) + 2 for value in snippet.row)
+        kinds = set()
+        for kind, size in unrolled.items():
+            branch = len(_PACK_CALLS[int(kind)]) + len(f"        elseif (Kind == {kind}) {{  }}\n")
+            if table[kind] + branch < size:
+                kinds.add(kind)
+        if not kinds:
+            return kinds
+        # The function, array setup and one call per run of consecutive packed objects must still pay off.
+        overhead = len("".join(self._packed_function(kinds))) + len(" Pk:array") + len("    Pk = array()\n")
+        run_end = None
+        for egp_id, snippet in snippets:
+            if snippet.row[:1] and snippet.row[0] in kinds:
+                if run_end != egp_id - 1:
+                    overhead += len(self._packed_call([egp_id, 1, 1])) + 4
+                run_end = egp_id
+        packed_size = sum(table[kind] for kind in kinds) + overhead
+        unrolled_size = sum(unrolled[kind] for kind in kinds)
+        if packed_size >= unrolled_size:
+            return set()
+        return kinds
+
+    def _packed_function(self, kinds: set[str]) -> list[str]:
+        """Description: E2 function that creates Count packed objects from Pk starting at egp id Id and row offset Row
+        Inputs: kinds: set[str]
+        """
+        return self._rename_locals([
+            "function packedObjects(Id, Row, Count)\n",
+            "{\n",
+            *self._packed_loop(kinds),
+            "}\n",
+        ])
+
+    def _packed_loop(self, kinds: set[str]) -> list[str]:
+        """Description: Interpreter loop body with one branch per packed call kind
+        Inputs: kinds: set[str]
+        """
+        lines = [
+            "    for (I = 0, Count - 1)\n",
+            "    {\n",
+            f"        K = Row + I * {_PACK_STRIDE}\n",
+            "        Kind = Pk[K, number]\n",
+            "        A = vec2(Pk[K + 1, number], Pk[K + 2, number]) * Scale\n",
+            "        B = vec2(Pk[K + 3, number], Pk[K + 4, number]) * Scale\n",
+        ]
+        ordered = sorted(kinds, key=int)
+        if len(ordered) == 1:
+            lines.append(f"        {_PACK_CALLS[int(ordered[0])]}\n")
+        else:
+            for index, kind in enumerate(ordered):
+                if index == len(ordered) - 1:
+                    lines.append(f"        else {{ {_PACK_CALLS[int(kind)]} }}\n")
+                else:
+                    keyword = "if" if index == 0 else "elseif"
+                    lines.append(f"        {keyword} (Kind == {kind}) {{ {_PACK_CALLS[int(kind)]} }}\n")
+        lines.extend([
+            "        EGP:egpColor(Id + I, vec4(Pk[K + 5, number], Pk[K + 6, number], Pk[K + 7, number], Pk[K + 8, number]))\n",
+            "    }\n",
+        ])
+        return lines
+
+    def _local_names(self, project: Project) -> Dict[str, str]:
+        """Description: Generated local -> a free name with a numeric suffix, for each local an input is named after
+        Inputs: project: Project
+        """
+        inputs = {input_def.name for input_def in project.inputs}
+        taken = _RESERVED_NAMES | set(_LOCAL_NAMES) | inputs
+        names: Dict[str, str] = {}
+        for name in _LOCAL_NAMES:
+            if name not in inputs:
+                continue
+            index = 1
+            while f"{name}{index}" in taken:
+                index += 1
+            names[name] = f"{name}{index}"
+            taken.add(names[name])
+        return names
+
+    def _rename_locals(self, lines: list[str]) -> list[str]:
+        """Description: Apply the local renames to generated lines (unchanged when nothing collides)
+        Inputs: lines: list[str]
+        """
+        if not self._locals:
+            return lines
+        return [_LOCAL_RE.sub(lambda match: self._locals.get(match.group(1), match.group(1)), line) for line in lines]
+
+    def _packed_call(self, run: list[int]) -> str:
+        """Description: Interpreter call for a run of consecutive packed objects [first egp id, first row, count]
+        Inputs: run: list[int]
+        """
+        return f"    packedObjects({run[0]}, {run[1]}, {run[2]})\n"
+
+    def _flush_run(self, run: list[int]) -> str:
+        """Description: Emit the call for a finished run and charge it against the table savings
+        Inputs: run: list[int]
+        """
+        call = self._packed_call(run)
+        self.report.table_chars_saved -= len(call)
+        return call
+
+    def _build_resize_block(self) -> list[str]:
+        """Description: Watch the screen size on a named timer and re-apply the layout table in bounded batches
+        Inputs: None
+        """
+        batch = max(1, self.options.resize_batch)
+        return self._rename_locals([
+            "if (clk(\"resize\"))\n",
+            "{\n",
+            "   Scr = egpScrSize(owner())\n",
+            "   if (Scr != LastScr)\n",
+            "   {\n",
+            "      LastScr = Scr\n",
+            "      X = Scr:x()\n",
+            "      Y = Scr:y()\n",
+            "      Res = Scr / 2\n",
+            "      Scale = vec2(X/ProjRes:x(), Y/ProjRes:y())\n",
+            "      ResizeAt = 1\n",
+            "   }\n",
+            "   if (ResizeAt)\n",
+            "   {\n",
+            f"      Last = min(ResizeAt + {batch - 1}, LayoutId:count())\n",
+            "      for (I = ResizeAt, Last)\n",
+            "      {\n",
+            "         Id = LayoutId[I, number]\n",
+            "         Kind = LayoutKind[I, number]\n",
+            "         At = LayoutAt[I, number]\n",
+            "         Org = Kind < 0 ? vec2() : Res\n",
+            f"         if (abs(Kind) == {_LAYOUT_VERTICES})\n",
+            "         {\n",
+            "            Verts = array()\n",
+            "            for (J = At, LayoutAt[I + 1, number] - 1)\n",
+            "            {\n",
+            "               Verts:pushVector2(Org + LayoutVec[J, vector2] * Scale)\n",
+            "            }\n",
+            "            EGP:egpSetVertices(Id, Verts)\n",
+            "         }\n",
+            "         else\n",
+            "         {\n",
+            "            EGP:egpPos(Id, Org + LayoutVec[At, vector2] * Scale)\n",
+            f"            if (abs(Kind) == {_LAYOUT_POS_SIZE})\n",
+            "            {\n",
+            "               EGP:egpSize(Id, LayoutVec[At + 1, vector2] * Scale)\n",
+            "            }\n",
+            "         }\n",
+            "      }\n",
+            "      ResizeAt = Last < LayoutId:count() ? Last + 1 : 0\n",
+            "   }\n",
+            f"   timer(\"resize\", ResizeAt ? {_MIN_INTERVAL} : {_RESIZE_POLL})\n",
+            "}\n",
+        ])
+
+    def _build_dynamic_block(
+        self,
+        project: Project,
+        dynamic_text: Dict[int, str],
+        dynamic_inputs: Dict[int, Tuple[str, ...]],
+        dynamic_rates: Dict[int, int],
+    ) -> list[str]:
         """Description: Build dynamic block
-        Inputs: dynamic_text: Dict[int, str]
+        Inputs: project: Project, dynamic_text: Dict[int, str], dynamic_inputs: Dict[int, Tuple[str, ...]], dynamic_rates: Dict[int, int]
         """
-        lines = ["if (clk())\n", "{\n", "   interval(100)\n"]
-        for egp_id, expr in dynamic_text.items():
-            lines.append(f"   EGP:egpSetText( {egp_id}, {expr} )\n")
+        if self.options.dynamic_updates == "changed":
+            return self._build_changed_block(dynamic_text, dynamic_inputs)
+        base_rate, multi_rate = self._schedule_base(dynamic_rates.values())
+        buckets: Dict[int, list[int]] = {}
+        for egp_id, rate in dynamic_rates.items():
+            buckets.setdefault(max(1, rate // base_rate), []).append(egp_id)
+        guard = "clk() & !Init" if self._staged() else "clk()"
+        lines = [f"if ({guard})\n", "{\n", f"   interval({base_rate})\n"]
+        if multi_rate:
+            period = 1
+            for every in buckets:
+                period = period * every // gcd(period, every)
+            lines.append(f"   Tick = (Tick + 1) % {period}\n")
+        for every in sorted(buckets):
+            egp_ids = buckets[every]
+            if every == 1:
+                for egp_id in egp_ids:
+                    lines.append(f"   EGP:egpSetText( {egp_id}, {dynamic_text[egp_id]} )\n")
+                continue
+            lines.extend([f"   if (Tick % {every} == 0)\n", "   {\n"])
+            for egp_id in egp_ids:
+                lines.append(f"      EGP:egpSetText( {egp_id}, {dynamic_text[egp_id]} )\n")
+            lines.append("   }\n")
         lines.append("}\n")
         return lines
+
+    def _build_changed_block(self, dynamic_text: Dict[int, str], dynamic_inputs: Dict[int, Tuple[str, ...]]) -> list[str]:
+        """Description: Group text updates by the inputs they read and guard each group with ~Input triggers
+        Inputs: dynamic_text: Dict[int, str], dynamic_inputs: Dict[int, Tuple[str, ...]]
+        """
+        groups: Dict[Tuple[str, ...], list[int]] = {}
+        for egp_id, names in dynamic_inputs.items():
+            groups.setdefault(names, []).append(egp_id)
+        lines: list[str] = []
+        for names, egp_ids in groups.items():
+            guard = " | ".join(f"~{name}" for name in names)
+            if self._staged():
+                # The last init stage runs on a timer tick, so clk() sends every text once when building ends.
+                guard = f"!Init & (clk() | {guard})"
+            lines.extend([f"if ({guard})\n", "{\n"])
+            for egp_id in egp_ids:
+                lines.append(f"   EGP:egpSetText( {egp_id}, {dynamic_text[egp_id]} )\n")
+            lines.append("}\n")
+        return lines
@@ -1,7 +1,11 @@
 """Entry point for the E2 HUD Designer."""
 
+from multiprocessing import freeze_support
+
 from app import run_app
 
 
 if __name__ == "__main__":
+    # Target exports run in worker processes; frozen (PyInstaller) builds need this to start them.
+    freeze_support()
     run_app()
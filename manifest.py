@@ -0,0 +1,112 @@
+# Record of what an export put on the screen, used for stable ids and patch exports.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Set
+
+
+class ManifestEntry(NamedTuple):
+    shape_id: str
+    # Content hash of the object's emitted code with the id left out.
+    digest: str
+    # Egp id of the anchor the object is parented to (0 = none).
+    parent: int = 0
+
+
+@dataclass
+class ExportManifest:
+    # egp id -> entry, in creation (draw) order.
+    objects: Dict[int, ManifestEntry] = field(default_factory=dict)
+
+    @property
+    def ids(self) -> Dict[str, int]:
+        """Description: Shape id -> egp id
+        Inputs: None
+        """
+        return {entry.shape_id: egp_id for egp_id, entry in self.objects.items()}
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {"objects": [[egp_id, *entry] for egp_id, entry in self.objects.items()]}
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "ExportManifest":
+        """Description: From dict
+        Inputs: cls, payload: Dict
+        """
+        objects = {}
+        for egp_id, shape_id, digest, *rest in payload.get("objects", []):
+            objects[int(egp_id)] = ManifestEntry(shape_id, digest, int(rest[0]) if rest else 0)
+        return cls(objects=objects)
+
+
+@dataclass
+class PatchPlan:
+    # Previous objects to egpRemove: gone, reassigned, changed, or out of draw order.
+    removed: List[int] = field(default_factory=list)
+    # Current objects left exactly as they are on screen.
+    unchanged: Set[int] = field(default_factory=set)
+    # Current objects (re)created, with their 1-based draw position.
+    created: Dict[int, int] = field(default_factory=dict)
+    # Created objects that replace a previous object of the same shape.
+    updated: Set[int] = field(default_factory=set)
+
+
+def plan_patch(previous: ExportManifest, current: ExportManifest) -> PatchPlan:
+    """Description: Work out the removes and creates that turn the previous screen into the current one
+    Inputs: previous: ExportManifest, current: ExportManifest
+    """
+    prev_order = {egp_id: index for index, egp_id in enumerate(previous.objects)}
+    same = [egp_id for egp_id, entry in current.objects.items() if previous.objects.get(egp_id) == entry]
+    # Creating always appends, so untouched objects must already be in the right relative order.
+    keep = set(_longest_increasing(same, prev_order))
+    for egp_id, entry in current.objects.items():
+        # A re-created anchor drops its children, so they are re-created too.
+        if egp_id in keep and entry.parent and entry.parent not in keep:
+            keep.discard(egp_id)
+    plan = PatchPlan(unchanged=keep)
+    for position, (egp_id, entry) in enumerate(current.objects.items(), start=1):
+        if egp_id in keep:
+            continue
+        plan.created[egp_id] = position
+        before = previous.objects.get(egp_id)
+        if before is not None and before.shape_id == entry.shape_id:
+            plan.updated.add(egp_id)
+    plan.removed = [egp_id for egp_id in previous.objects if egp_id not in keep]
+    return plan
+
+
+def _longest_increasing(egp_ids: List[int], order: Dict[int, int]) -> List[int]:
+    """Description: Longest subsequence of egp_ids whose previous draw positions increase
+    Inputs: egp_ids: List[int], order: Dict[int, int]
+    """
+    tails: List[int] = []
+    tail_index: List[int] = []
+    parents = [-1] * len(egp_ids)
+    for index, egp_id in enumerate(egp_ids):
+        value = order[egp_id]
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if tails[middle] < value:
+                low = middle + 1
+            else:
+                high = middle
+        if low > 0:
+            parents[index] = tail_index[low - 1]
+        if low == len(tails):
+            tails.append(value)
+            tail_index.append(index)
+        else:
+            tails[low] = value
+            tail_index[low] = index
+    result = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        result.append(egp_ids[index])
+        index = parents[index]
+    result.reverse()
+    return result
@@ -0,0 +1,165 @@
+# Minified writer for generated Expression2 EGP code.
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+import re
+
+# Persisted names the exporter owns, renamed in this order to the first free short name.
+RENAMED = (
+    "Res", "Scale", "ProjRes", "Tick", "Init", "LastScr", "ResizeAt",
+    "LayoutId", "LayoutKind", "LayoutAt", "LayoutVec", "Pk",
+)
+# Names the exporter emits unchanged; short names must never collide with them.
+KEPT = {
+    "EGP", "X", "Y", "Scr", "Last", "I", "J", "K", "A", "B",
+    "Id", "Kind", "At", "Org", "Verts", "Row", "Count",
+}
+DEFAULT_NAME = "Untitled"
+
+_TOKEN_RE = re.compile(
+    r'"(?:\\.|[^"\\])*"'
+    r"|\d+(?:\.\d+)?"
+    r"|[A-Za-z_]\w*"
+    r"|==|!=|>=|<=|\+=|-=|\*=|/=|\+\+|--|&&|\|\|"
+    r"|\S"
+)
+_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*")')
+_NUM = r"-?\d+(?:\.\d+)?"
+_WORD_END = re.compile(r"\w$")
+_WORD_START = re.compile(r"^\w")
+# Adjacent characters that would fuse into a different operator if the space between them went away.
+_FUSING = {"--", "++", "==", "!=", ">=", "<=", "+=", "-=", "*=", "/=", "&&", "||"}
+
+
+@dataclass
+class MinifyReport:
+    pretty_chars: int = 0
+    minified_chars: int = 0
+    # Original -> short name, so tools reading the minified script can map names back.
+    names: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ratio(self) -> float:
+        """Description: Minified size as a fraction of the pretty size
+        Inputs: None
+        """
+        return self.minified_chars / self.pretty_chars if self.pretty_chars else 1.0
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {
+            "pretty_chars": self.pretty_chars,
+            "minified_chars": self.minified_chars,
+            "ratio": round(self.ratio, 4),
+        }
+
+
+class Minifier:
+    def __init__(self, reserved: Iterable[str] = ()) -> None:
+        """Description: Build a deterministic rename map that avoids reserved names (inputs, hoisted vectors)
+        Inputs: reserved: Iterable[str]
+        """
+        taken = set(KEPT) | set(reserved)
+        self.names: Dict[str, str] = {}
+        pool = _short_names()
+        for name in RENAMED:
+            short = next(pool)
+            while short in taken:
+                short = next(pool)
+            self.names[name] = short
+            taken.add(short)
+        scale = self.names["Scale"]
+        res = self.names["Res"]
+        self._rewrites = [
+            # vec2(a*Scale:x(),b*Scale:y()) is a component-wise product.
+            (re.compile(rf"vec2\(({_NUM})\*{scale}:x\(\),({_NUM})\*{scale}:y\(\)\)"), rf"vec2(\1,\2)*{scale}"),
+            (re.compile(rf"vec2\(({_NUM})\*{scale}:x\(\),({_NUM})\*{scale}:x\(\)\)"), rf"vec2(\1,\2)*{scale}:x()"),
+            (re.compile(r"vec2\(0,0\)"), "vec2()"),
+            (re.compile(rf"{res}\+vec2\(\)\*{scale}(?![:\w])"), res),
+            (re.compile(rf"vec2\(\)\*{scale}(?::x\(\))?(?![:\w])"), "vec2()"),
+        ]
+        self.report = MinifyReport(names=dict(self.names))
+
+    def minify(self, code: str) -> str:
+        """Description: Minify a chunk of whole lines; output depends only on the input and the rename map
+        Inputs: code: str
+        """
+        out: List[str] = []
+        for line in code.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if stripped.startswith("@"):
+                text = self._directive(stripped)
+                if text:
+                    out.append(text)
+                continue
+            text = self._statement(stripped)
+            if text == "{" and out:
+                out[-1] += text
+            else:
+                out.append(text)
+        result = "".join(f"{line}\n" for line in out)
+        self.report.pretty_chars += len(code)
+        self.report.minified_chars += len(result)
+        return result
+
+    def _directive(self, line: str) -> str:
+        """Description: Rename declared names and collapse spacing in an @directive; drops the default @name
+        Inputs: line: str
+        """
+        parts = line.split()
+        if parts[0] == "@name":
+            return "" if parts[1:] == [DEFAULT_NAME] else line
+        renamed = [parts[0]]
+        for part in parts[1:]:
+            name, sep, kind = part.partition(":")
+            renamed.append(self.names.get(name, name) + sep + kind)
+        return " ".join(renamed)
+
+    def _statement(self, line: str) -> str:
+        """Description: Re-join a statement's tokens with only the spaces E2 needs
+        Inputs: line: str
+        """
+        text = ""
+        for token in _TOKEN_RE.findall(line):
+            if token[0].isdigit():
+                token = trim_number(token)
+            else:
+                token = self.names.get(token, token)
+            if text and (
+                (_WORD_END.search(text) and _WORD_START.match(token))
+                or text[-1] + token[0] in _FUSING
+            ):
+                text += " "
+            text += token
+        pieces = _STRING_RE.split(text)
+        for index in range(0, len(pieces), 2):
+            for pattern, replacement in self._rewrites:
+                pieces[index] = pattern.sub(replacement, pieces[index])
+        return "".join(pieces)
+
+
+def _short_names() -> Iterable[str]:
+    """Description: A..Z, then AA..ZZ
+    Inputs: None
+    """
+    letters = [chr(code) for code in range(ord("A"), ord("Z") + 1)]
+    yield from letters
+    for first in letters:
+        for second in letters:
+            yield first + second
+
+
+def trim_number(token: str) -> str:
+    """Description: Drop trailing zeros and a bare decimal point
+    Inputs: token: str
+    """
+    if "." not in token:
+        return token
+    token = token.rstrip("0").rstrip(".")
+    return token or "0"
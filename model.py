@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
 import uuid
 
 Point = Tuple[float, float]
@@ -20,6 +21,7 @@ class Shape:
     font: str = ""
     font_size: int = 12
     align: str = "left"
+    update_rate: int = 0
 
     def to_dict(self) -> Dict:
         """Description: To dict
@@ -37,6 +39,7 @@ class Shape:
             "font": self.font,
             "font_size": self.font_size,
             "align": self.align,
+            "update_rate": self.update_rate,
         }
 
     @classmethod
@@ -56,6 +59,7 @@ class Shape:
             font=payload.get("font", ""),
             font_size=int(payload.get("font_size", 12)),
             align=payload.get("align", "left"),
+            update_rate=int(payload.get("update_rate", 0)),
         )
 
 
@@ -100,19 +104,140 @@ class Layer:
 class InputDef:
     name: str
     type: str
+    rate: int = 100
 
     def to_dict(self) -> Dict:
         """Description: To dict
         Inputs: None
         """
-        return {"name": self.name, "type": self.type}
+        return {"name": self.name, "type": self.type, "rate": self.rate}
 
     @classmethod
     def from_dict(cls, payload: Dict) -> "InputDef":
         """Description: From dict
         Inputs: cls, payload: Dict
         """
-        return cls(name=payload.get("name", ""), type=payload.get("type", "Normal"))
+        return cls(
+            name=payload.get("name", ""),
+            type=payload.get("type", "Normal"),
+            rate=int(payload.get("rate", 100)),
+        )
+
+
+@dataclass
+class PrecisionPolicy:
+    decimals: int = 3
+    # "none", "whole" or "half": snap exported coordinates and sizes to the pixel grid.
+    snap: str = "none"
+    # Values within this distance of a whole pixel are exported as that integer (0 = off).
+    integer_tolerance: float = 0.0
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {"decimals": self.decimals, "snap": self.snap, "integer_tolerance": self.integer_tolerance}
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "PrecisionPolicy":
+        """Description: From dict
+        Inputs: cls, payload: Dict
+        """
+        snap = payload.get("snap", "none")
+        return cls(
+            decimals=max(0, int(payload.get("decimals", 3))),
+            snap=snap if snap in ("none", "whole", "half") else "none",
+            integer_tolerance=max(0.0, float(payload.get("integer_tolerance", 0.0))),
+        )
+
+
+@dataclass
+class IdAllocator:
+    # shape id -> egp id; survives visibility toggles, layer reordering and save/load.
+    ids: Dict[str, int] = field(default_factory=dict)
+    # Released egp ids, reused lowest first before new ones are issued.
+    free: List[int] = field(default_factory=list)
+    next_id: int = 1
+
+    def allocate(self, shape_id: str) -> int:
+        """Description: Egp id for a shape, assigning the lowest released id (or a new one) the first time it is seen
+        Inputs: shape_id: str
+        """
+        egp_id = self.ids.get(shape_id)
+        if egp_id is not None:
+            return egp_id
+        if self.free:
+            egp_id = heapq.heappop(self.free)
+        else:
+            egp_id = self.next_id
+            self.next_id += 1
+        self.ids[shape_id] = egp_id
+        return egp_id
+
+    def release(self, shape_id: str) -> None:
+        """Description: Return a shape's egp id to the free list
+        Inputs: shape_id: str
+        """
+        egp_id = self.ids.pop(shape_id, None)
+        if egp_id is not None:
+            heapq.heappush(self.free, egp_id)
+
+    def prune(self, live: Callable[[str], bool]) -> int:
+        """Description: Release the ids of shapes that no longer exist; returns how many were released
+        Inputs: live: Callable[[str], bool]
+        """
+        stale = [shape_id for shape_id in self.ids if not live(shape_id)]
+        for shape_id in stale:
+            self.release(shape_id)
+        return len(stale)
+
+    def adopt(self, ids: Dict[str, int]) -> int:
+        """Description: Take over shape id -> egp id pairs (e.g. from an export manifest) for shapes not yet allocated, skipping ids in use; returns how many were adopted
+        Inputs: ids: Dict[str, int]
+        """
+        used = set(self.ids.values())
+        adopted = 0
+        for shape_id, egp_id in ids.items():
+            if shape_id in self.ids or egp_id in used:
+                continue
+            self.ids[shape_id] = egp_id
+            used.add(egp_id)
+            adopted += 1
+        if adopted:
+            # Ids skipped over by the adopted ones become free, so new shapes fill the gaps lowest first.
+            self.next_id = max(self.next_id, max(used) + 1)
+            self.free = sorted(set(range(1, self.next_id)) - used)
+        return adopted
+
+    def compact(self, shape_ids: List[str]) -> int:
+        """Description: Renumber the given shapes 1..N in order and drop everything else; returns how many ids changed
+        Inputs: shape_ids: List[str]
+        """
+        ids: Dict[str, int] = {}
+        for shape_id in shape_ids:
+            ids.setdefault(shape_id, len(ids) + 1)
+        changed = sum(1 for shape_id, egp_id in ids.items() if self.ids.get(shape_id) != egp_id)
+        self.ids = ids
+        self.free = []
+        self.next_id = len(ids) + 1
+        return changed
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        return {"ids": dict(self.ids), "free": sorted(self.free), "next_id": self.next_id}
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "IdAllocator":
+        """Description: From dict
+        Inputs: cls, payload: Dict
+        """
+        ids = {str(shape_id): int(egp_id) for shape_id, egp_id in payload.get("ids", {}).items()}
+        used = set(ids.values())
+        free = sorted({int(egp_id) for egp_id in payload.get("free", [])} - used)
+        next_id = max([int(payload.get("next_id", 1)), *(egp_id + 1 for egp_id in used), *(egp_id + 1 for egp_id in free)])
+        return cls(ids=ids, free=free, next_id=next_id)
 
 
 @dataclass
@@ -121,6 +246,8 @@ class Project:
     layers: List[Layer]
     active_layer_id: str
     inputs: List[InputDef] = field(default_factory=list)
+    precision: PrecisionPolicy = field(default_factory=PrecisionPolicy)
+    egp_ids: IdAllocator = field(default_factory=IdAllocator)
 
     @classmethod
     def new(cls, resolution: Tuple[int, int]) -> "Project":
@@ -139,6 +266,8 @@ class Project:
             "active_layer_id": self.active_layer_id,
             "layers": [layer.to_dict() for layer in self.layers],
             "inputs": [input_def.to_dict() for input_def in self.inputs],
+            "precision": self.precision.to_dict(),
+            "egp_ids": self.egp_ids.to_dict(),
         }
 
     @classmethod
@@ -150,12 +279,30 @@ class Project:
         layers = [Layer.from_dict(item) for item in payload.get("layers", [])]
         active_layer_id = payload.get("active_layer_id")
         inputs = [InputDef.from_dict(item) for item in payload.get("inputs", [])]
+        precision = PrecisionPolicy.from_dict(payload.get("precision", {}))
+        egp_ids = IdAllocator.from_dict(payload.get("egp_ids", {}))
         if not layers:
             layers = [Layer(id=str(uuid.uuid4()), name="Layer 1")]
             active_layer_id = layers[0].id
         if active_layer_id is None:
             active_layer_id = layers[0].id
-        return cls(resolution=resolution, layers=layers, active_layer_id=active_layer_id, inputs=inputs)
+        return cls(resolution=resolution, layers=layers, active_layer_id=active_layer_id, inputs=inputs, precision=precision, egp_ids=egp_ids)
+
+    def rescale(self, resolution: Tuple[int, int]) -> None:
+        """Description: Scale every shape to a new resolution (stroke widths by the mean axis scale) and adopt it
+        Inputs: resolution: Tuple[int, int]
+        """
+        resolution = (int(resolution[0]), int(resolution[1]))
+        old = self.resolution
+        if tuple(old) != resolution:
+            scale_x = resolution[0] / old[0]
+            scale_y = resolution[1] / old[1]
+            scale_avg = (scale_x + scale_y) / 2
+            for layer in self.layers:
+                for shape in layer.shapes:
+                    shape.points = [(p[0] * scale_x, p[1] * scale_y) for p in shape.points]
+                    shape.stroke_width = max(1, int(shape.stroke_width * scale_avg))
+        self.resolution = resolution
 
     def get_layer(self, layer_id: str) -> Optional[Layer]:
         """Description: Get layer
@@ -1,6 +1,8 @@
 import json
+import os
 from typing import Optional
 
+from manifest import ExportManifest
 from model import Project
 
 
@@ -20,3 +22,44 @@ def load_project(path: str) -> Project:
     with open(path, "r", encoding="utf-8") as file:
         payload = json.load(file)
     return Project.from_dict(payload)
+
+
+def manifest_path(export_path: str) -> str:
+    """Description: Sidecar manifest path for an exported HUD script
+    Inputs: export_path: str
+    """
+    return export_path + ".manifest.json"
+
+
+def save_manifest(manifest: ExportManifest, path: str) -> None:
+    """Description: Save export manifest
+    Inputs: manifest: ExportManifest, path: str
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest.to_dict(), file)
+
+
+def load_manifest(path: str) -> Optional[ExportManifest]:
+    """Description: Load export manifest; None when the script was never exported with one
+    Inputs: path: str
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        payload = json.load(file)
+    return ExportManifest.from_dict(payload)
+
+
+def id_map_path(export_path: str) -> str:
+    """Description: Sidecar id map path for an exported HUD script
+    Inputs: export_path: str
+    """
+    return export_path + ".ids.json"
+
+
+def save_id_map(manifest: ExportManifest, path: str) -> None:
+    """Description: Save shape id -> egp id for runtime chips (fileLoad + jsonDecode)
+    Inputs: manifest: ExportManifest, path: str
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest.ids, file, indent=2, sort_keys=True)
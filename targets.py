@@ -0,0 +1,104 @@
+# Export one project to several target profiles (resolution, precision, options) in one pass.
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import json
+
+from exporter import ExportOptions, ExportReport, HudExporter
+from model import PrecisionPolicy, Project
+
+
+@dataclass
+class ExportTarget:
+    name: str
+    resolution: Tuple[int, int]
+    # None keeps the project's own precision policy.
+    precision: Optional[PrecisionPolicy] = None
+    # ExportOptions fields overridden for this target on top of the base options.
+    options: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """Description: To dict
+        Inputs: None
+        """
+        payload = {"name": self.name, "resolution": list(self.resolution), "options": dict(self.options)}
+        if self.precision is not None:
+            payload["precision"] = self.precision.to_dict()
+        return payload
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "ExportTarget":
+        """Description: From dict; unknown option names are dropped
+        Inputs: cls, payload: Dict
+        """
+        known = {option.name for option in fields(ExportOptions)}
+        precision = payload.get("precision")
+        return cls(
+            name=str(payload["name"]),
+            resolution=(int(payload["resolution"][0]), int(payload["resolution"][1])),
+            precision=PrecisionPolicy.from_dict(precision) if precision is not None else None,
+            options={name: value for name, value in payload.get("options", {}).items() if name in known},
+        )
+
+
+class TargetResult(NamedTuple):
+    target: ExportTarget
+    code: str
+    report: ExportReport
+
+
+def load_targets(path: str) -> List[ExportTarget]:
+    """Description: Load a JSON list of target profiles
+    Inputs: path: str
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        payload = json.load(file)
+    return [ExportTarget.from_dict(item) for item in payload]
+
+
+def scaled_payload(payload: Dict, resolution: Tuple[int, int]) -> Dict:
+    """Description: Serialised project rescaled to a resolution with Project.rescale, as the editor's resolution picker does
+    Inputs: payload: Dict, resolution: Tuple[int, int]
+    """
+    if tuple(payload["resolution"]) == tuple(resolution):
+        return payload
+    project = Project.from_dict(payload)
+    project.rescale(resolution)
+    return project.to_dict()
+
+
+def export_target(payload: Dict, target: ExportTarget, options: ExportOptions) -> TargetResult:
+    """Description: Export one target from its (already scaled) project payload; runs in a worker process
+    Inputs: payload: Dict, target: ExportTarget, options: ExportOptions
+    """
+    project = Project.from_dict(payload)
+    if target.precision is not None:
+        project.precision = target.precision
+    exporter = HudExporter(options=replace(options, **target.options))
+    code = exporter.export_to_string(project)
+    return TargetResult(target, code, exporter.report)
+
+
+def export_targets(
+    project: Project,
+    targets: List[ExportTarget],
+    options: ExportOptions | None = None,
+    workers: int = 1,
+) -> List[TargetResult]:
+    """Description: One script per target in target order; the project is snapshotted once, scaled once per distinct resolution, and never modified
+    Inputs: project: Project, targets: List[ExportTarget], options: ExportOptions | None = None, workers: int = 1
+    """
+    options = options or ExportOptions()
+    source = project.to_dict()
+    scaled: Dict[Tuple[int, int], Dict] = {}
+    for target in targets:
+        if target.resolution not in scaled:
+            scaled[target.resolution] = scaled_payload(source, target.resolution)
+    if workers <= 1 or len(targets) <= 1:
+        return [export_target(scaled[target.resolution], target, options) for target in targets]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(export_target, scaled[target.resolution], target, options) for target in targets]
+        return [future.result() for future in futures]
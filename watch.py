@@ -0,0 +1,216 @@
+"""Watch HUD projects and re-export them when they change, by mtime polling."""
+
+from __future__ import annotations
+
+from hashlib import sha1
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+
+from batch import BatchJob, add_option_arguments, find_projects, is_current, option_values, target_path
+from exporter import ExportOptions, HudExporter, SnippetCache
+from model import Project
+from storage import load_manifest, manifest_path, save_manifest
+
+# Snippet cache entries per shape or layer anchor: room for split poly pieces and the previous save's snippets.
+CACHE_ENTRIES_PER_SHAPE = 2
+
+
+class _CachedProject(NamedTuple):
+    # (mtime_ns, size) the project was read at.
+    stamp: Tuple[int, int]
+    digest: str
+    project: Project
+
+
+class ProjectCache:
+    def __init__(self) -> None:
+        """Description: Parsed projects kept in memory, re-read only when a file's mtime or size moves
+        Inputs: None
+        """
+        self._entries: Dict[str, _CachedProject] = {}
+
+    def load(self, path: str) -> Tuple[Project, bool]:
+        """Description: The parsed project and whether its content changed since the last load
+        Inputs: path: str
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry.project, False
+        with open(path, "rb") as file:
+            data = file.read()
+        digest = sha1(data).hexdigest()
+        if entry is not None and entry.digest == digest:
+            # Saved again without edits: keep the parsed project and skip the export.
+            self._entries[path] = entry._replace(stamp=stamp)
+            return entry.project, False
+        project = Project.from_dict(json.loads(data.decode("utf-8")))
+        self._entries[path] = _CachedProject(stamp, digest, project)
+        return project, True
+
+    def forget(self, path: str) -> None:
+        """Description: Drop a project that was deleted or renamed
+        Inputs: path: str
+        """
+        self._entries.pop(path, None)
+
+
+class ProjectWatcher:
+    def __init__(
+        self,
+        paths: List[str],
+        out_dir: Optional[str] = None,
+        options: ExportOptions | None = None,
+        debounce: float = 0.3,
+        patch: bool = False,
+    ) -> None:
+        """Description: Re-export projects under paths once their mtime has been stable for the debounce period
+        Inputs: paths: List[str], out_dir: Optional[str] = None, options: ExportOptions | None = None, debounce: float = 0.3, patch: bool = False
+        """
+        self.paths = paths
+        self.out_dir = out_dir
+        self.options = options or ExportOptions()
+        self.debounce = debounce
+        self.patch = patch
+        self.projects = ProjectCache()
+        self.log: Callable[[str], None] = print
+        self._mtimes: Dict[str, float] = {}
+        # path -> (mtime seen, when it was first seen); exported once the mtime stops moving.
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        # One exporter, and so one snippet cache, per project so large HUDs never evict each other's snippets.
+        self._exporters: Dict[str, HudExporter] = {}
+
+    def start(self) -> None:
+        """Description: Record every project and export the ones whose script is missing or older
+        Inputs: None
+        """
+        for source in find_projects(self.paths):
+            self._mtimes[source] = os.path.getmtime(source)
+            job = BatchJob(source, target_path(source, self.out_dir), {})
+            if not is_current(job, "mtime", {}):
+                self.export(source)
+                continue
+            try:
+                self.projects.load(source)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.log(f"{source}: FAILED {type(exc).__name__}: {exc}")
+
+    def poll(self, now: float | None = None) -> List[str]:
+        """Description: One polling pass; returns the projects exported during it
+        Inputs: now: float | None = None
+        """
+        now = time.monotonic() if now is None else now
+        found = set()
+        for source in find_projects(self.paths):
+            found.add(source)
+            try:
+                mtime = os.path.getmtime(source)
+            except OSError:
+                continue
+            if mtime == self._mtimes.get(source):
+                continue
+            pending = self._pending.get(source)
+            if pending is None or pending[0] != mtime:
+                self._pending[source] = (mtime, now)
+        for source in list(self._mtimes):
+            if source not in found:
+                self._forget(source)
+        exported = []
+        for source, (mtime, seen) in list(self._pending.items()):
+            if now - seen < self.debounce:
+                continue
+            del self._pending[source]
+            self._mtimes[source] = mtime
+            if self.export(source):
+                exported.append(source)
+        return exported
+
+    def run(self, interval: float = 0.25, should_stop: Callable[[], bool] = lambda: False) -> None:
+        """Description: Start, then poll until should_stop() (or Ctrl+C)
+        Inputs: interval: float = 0.25, should_stop: Callable[[], bool]
+        """
+        self.start()
+        try:
+            while not should_stop():
+                time.sleep(interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+
+    def export(self, source: str) -> bool:
+        """Description: Re-export one project if its content changed; errors are logged and the watch continues
+        Inputs: source: str
+        """
+        start = time.perf_counter()
+        target = target_path(source, self.out_dir)
+        try:
+            project, changed = self.projects.load(source)
+            exporter = self._exporters.get(source)
+            if not changed and exporter is not None:
+                return False
+            entries = CACHE_ENTRIES_PER_SHAPE * (len(project.layers) + sum(len(layer.shapes) for layer in project.layers))
+            if exporter is None:
+                cache = SnippetCache(entries)
+                exporter = HudExporter(cache=cache, options=self.options, manifest=load_manifest(manifest_path(target)))
+                self._exporters[source] = exporter
+            cache = exporter.cache
+            cache.max_entries = max(cache.max_entries, entries)
+            hits, misses = cache.hits, cache.misses
+            previous = exporter.base_manifest
+            if self.patch and previous is not None:
+                with open(target[: -len(".txt")] + ".patch.txt", "w", encoding="utf-8") as file:
+                    file.write(exporter.export_patch_to_string(project, previous))
+            data = exporter.export_to_string(project)
+            with open(target, "w", encoding="utf-8") as file:
+                file.write(data)
+            save_manifest(exporter.manifest, manifest_path(target))
+            # The next export keeps the ids this one handed out.
+            exporter.base_manifest = exporter.manifest
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            self.log(f"{source}: FAILED {type(exc).__name__}: {exc}")
+            return False
+        self.log(
+            f"{source} -> {target}: {(time.perf_counter() - start) * 1000:.1f} ms, "
+            f"{cache.hits - hits} cached / {cache.misses - misses} rendered snippets"
+        )
+        return True
+
+    def _forget(self, source: str) -> None:
+        """Description: Stop tracking a project that disappeared
+        Inputs: source: str
+        """
+        self._mtimes.pop(source, None)
+        self._pending.pop(source, None)
+        self._exporters.pop(source, None)
+        self.projects.forget(source)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Description: Watch projects and re-export them on change until interrupted
+    Inputs: argv: Optional[List[str]] = None
+    """
+    parser = argparse.ArgumentParser(description="Re-export HUD projects whenever they are saved.")
+    parser.add_argument("paths", nargs="+", help="projects or directories to watch")
+    parser.add_argument("-o", "--out-dir", help="write scripts here instead of next to each project")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between mtime polls")
+    parser.add_argument("--debounce", type=float, default=0.3, help="seconds a file must stay unchanged before exporting")
+    parser.add_argument("--patch", action="store_true", help="also write <name>.patch.txt against the previous export")
+    add_option_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = ExportOptions(**option_values(args))
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    watcher = ProjectWatcher(args.paths, args.out_dir, options, args.debounce, args.patch)
+    print(f"Watching {', '.join(args.paths)} (Ctrl+C to stop)")
+    watcher.run(args.interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())